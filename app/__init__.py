@@ -1,6 +1,17 @@
 """
 应用初始化模块
 """
-from app.main import app
 
-__all__ = ['app']
\ No newline at end of file
+def __getattr__(name):
+    """
+    延迟导入应用对象
+
+    导入 app.main 会加载模型并创建各服务实例，多进程模式下的前端路由进程
+    只需要 app.cluster，不应在导入包时加载模型。
+    """
+    if name == 'app':
+        from app.main import app
+        return app
+    raise AttributeError(f"module 'app' has no attribute {name!r}")
+
+__all__ = ['app']
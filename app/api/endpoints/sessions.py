@@ -0,0 +1,149 @@
+"""
+历史会话相关的API端点
+"""
+from fastapi import APIRouter
+from app.models.schemas import RetranscribeRequest
+from app.services.storage import transcript_store
+from app.services.archive import audio_archive
+from app.services.cache import result_cache
+from app.services.transcription import transcription_service
+from app.config import AVAILABLE_MODELS, ARCHIVE_CONFIG
+
+router = APIRouter()
+
+@router.get('/sessions')
+def list_sessions(limit: int = 50, offset: int = 0):
+    """
+    列出已保存的转写会话
+    
+    Args:
+        limit: 返回数量
+        offset: 偏移
+    
+    Returns:
+        按开始时间倒序的会话列表
+    """
+    limit = max(1, min(limit, 500))
+    return {"status": "success", "sessions": transcript_store.list_sessions(limit, max(offset, 0))}
+
+@router.get('/sessions/{session_id}')
+def get_session(session_id: str):
+    """
+    获取会话详情及其参数快照
+    
+    Args:
+        session_id: 会话编号
+    
+    Returns:
+        会话信息
+    """
+    session = transcript_store.get_session(session_id)
+    if session is None:
+        return {"status": "error", "message": f"会话不存在: {session_id}"}
+    return {"status": "success", "session": session}
+
+@router.get('/sessions/{session_id}/segments')
+def get_session_segments(session_id: str, start_ms: int = None, end_ms: int = None, limit: int = 1000):
+    """
+    按时间范围查询会话的分段
+    
+    Args:
+        session_id: 会话编号
+        start_ms: 起始偏移（毫秒）
+        end_ms: 结束偏移（毫秒）
+        limit: 返回数量
+    
+    Returns:
+        按时间排序的分段列表
+    """
+    limit = max(1, min(limit, 10000))
+    return {
+        "status": "success",
+        "segments": transcript_store.query_segments(session_id, start_ms, end_ms, limit)
+    }
+
+@router.post('/sessions/{session_id}/delete_segments')
+def delete_session_segments(session_id: str):
+    """
+    删除会话已保存的全部分段（不可恢复）
+    
+    Args:
+        session_id: 会话编号
+    
+    Returns:
+        操作状态
+    """
+    if transcript_store.get_session(session_id) is None:
+        return {"status": "error", "message": f"会话不存在: {session_id}"}
+    transcript_store.delete_segments(session_id)
+    return {"status": "success", "message": f"已删除会话 {session_id} 的分段"}
+
+@router.post('/sessions/{session_id}/retranscribe')
+def retranscribe_session(session_id: str, request: RetranscribeRequest):
+    """
+    使用指定模型重新转写会话归档音频中的一段
+    
+    Args:
+        session_id: 会话编号
+        request: 时间范围、模型和解码参数
+    
+    Returns:
+        重新转写的分段列表
+    """
+    if request.model not in AVAILABLE_MODELS:
+        return {"status": "error", "message": f"不支持的模型: {request.model}"}
+    if request.end_ms <= request.start_ms:
+        return {"status": "error", "message": "end_ms 必须大于 start_ms"}
+    if request.end_ms - request.start_ms > ARCHIVE_CONFIG["max_retranscribe_seconds"] * 1000:
+        return {"status": "error", "message": f"单次最多重新转写 {ARCHIVE_CONFIG['max_retranscribe_seconds']} 秒"}
+    if not 1 <= request.beam_size <= 10:
+        return {"status": "error", "message": "beam_size 必须在 1 到 10 之间"}
+    
+    try:
+        return transcription_service.retranscribe(
+            session_id, request.start_ms, request.end_ms,
+            request.model, request.language, request.beam_size
+        )
+    except Exception as e:
+        return {"status": "error", "message": f"重新转写失败: {str(e)}"}
+
+@router.get('/archive_status')
+def get_archive_status():
+    """
+    获取音频归档状态
+    
+    Returns:
+        归档开关、目录和当前会话的归档时长
+    """
+    return {"status": "success", "archive": audio_archive.get_status()}
+
+@router.get('/cache_status')
+def get_cache_status():
+    """
+    获取转写结果缓存的规模和命中率
+    
+    Returns:
+        缓存状态
+    """
+    return {"status": "success", "cache": result_cache.get_status()}
+
+@router.post('/clear_cache')
+def clear_cache():
+    """
+    清空转写结果缓存
+    
+    Returns:
+        操作状态
+    """
+    result_cache.clear()
+    return {"status": "success", "message": "转写结果缓存已清空"}
+
+@router.get('/storage_status')
+def get_storage_status():
+    """
+    获取持久化存储状态
+    
+    Returns:
+        数据库路径和写入统计
+    """
+    return {"status": "success", "storage": transcript_store.get_status()}
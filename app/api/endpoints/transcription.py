@@ -1,13 +1,25 @@
 """
 转写相关的API端点
 """
+import os
+import time
+import threading
 from fastapi import APIRouter
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
-from app.models.schemas import ModelRequest, LanguageRequest, TimestampRequest
+from app.models.schemas import (
+    ModelRequest, LanguageRequest, TimestampRequest, PreprocessModeRequest, ProbeRequest
+)
 from app.services.transcription import transcription_service
 from app.services.whisper import whisper_service
-from app.config import AVAILABLE_MODELS, ANTI_HALLUCINATION_CONFIG, HALLUCINATION_PATTERNS
+from app.services.escalation import escalation_service
+from app.services.model_loader import model_loader
+from app.services.features import feature_cache
+from app.services.broadcast import broadcaster
+from app.services import denoise
+from app.config import (
+    AVAILABLE_MODELS, ANTI_HALLUCINATION_CONFIG, HALLUCINATION_PATTERNS, ADAPTIVE_GATING_CONFIG
+)
 
 router = APIRouter()
 
@@ -18,6 +30,7 @@ class AntiHallucinationConfigRequest(BaseModel):
     confidence_threshold: float = None
     energy_threshold: float = None
     silence_threshold: float = None
+    adaptive_gating: bool = None
 
 @router.get('/models')
 def get_models():
@@ -32,11 +45,14 @@ def change_model(request: ModelRequest):
     """
     切换Whisper模型
     
+    模型在后台加载，接口立即返回任务信息；加载期间当前模型继续服务，
+    进度通过 WebSocket 的 model_job 事件推送，也可通过 /model_jobs/{job_id} 查询。
+    
     Args:
         request: 包含模型名称的请求对象
     
     Returns:
-        操作状态和消息
+        操作状态、消息和任务信息
     """
     model_name = request.model
     
@@ -46,11 +62,44 @@ def change_model(request: ModelRequest):
     if transcription_service.running:
         return {"status": "error", "message": "请先停止转写再切换模型"}
     
-    try:
-        whisper_service.load_model(model_name)
-        return {"status": "success", "message": f"已切换到模型: {model_name}"}
-    except Exception as e:
-        return {"status": "error", "message": f"切换模型失败: {str(e)}"}
+    if model_name == whisper_service.model_name:
+        return {"status": "success", "message": f"当前已是模型: {model_name}"}
+    
+    return model_loader.submit(model_name)
+
+@router.get('/model_jobs')
+def get_model_jobs():
+    """返回当前模型、进行中的加载任务和历史任务"""
+    return model_loader.get_status()
+
+@router.get('/model_jobs/{job_id}')
+def get_model_job(job_id: int):
+    """
+    查询模型加载任务
+    
+    Args:
+        job_id: 任务编号
+    
+    Returns:
+        任务信息
+    """
+    job = model_loader.get_job(job_id)
+    if job is None:
+        return {"status": "error", "message": f"任务不存在: {job_id}"}
+    return job
+
+@router.post('/model_jobs/{job_id}/cancel')
+def cancel_model_job(job_id: int):
+    """
+    取消模型加载任务
+    
+    Args:
+        job_id: 任务编号
+    
+    Returns:
+        操作状态和消息
+    """
+    return model_loader.cancel(job_id)
 
 @router.post('/change_language')
 def change_language(request: LanguageRequest):
@@ -65,6 +114,132 @@ def change_language(request: LanguageRequest):
     """
     return transcription_service.set_language(request.language)
 
+@router.get('/language_status')
+def get_language_status():
+    """
+    获取当前语言设置及自动检测结果
+    
+    Returns:
+        语言模式和会话缓存的检测结果
+    """
+    return {
+        "status": "success",
+        "language": transcription_service.current_language,
+        "detection": transcription_service.language_detector.get_status()
+    }
+
+@router.get('/websocket_status')
+def get_websocket_status():
+    """
+    获取WebSocket订阅者数量、协议分布和推送积压情况
+    
+    Returns:
+        广播状态
+    """
+    return {"status": "success", "websocket": broadcaster.get_status()}
+
+@router.post('/websocket_probe')
+def websocket_probe(request: ProbeRequest):
+    """
+    向所有订阅者广播一个探测事件，压测工具据此测量推送延迟
+    
+    Args:
+        request: 探测编号和客户端发送时间
+    
+    Returns:
+        事件序号
+    """
+    seq = broadcaster.publish('probe', {'id': request.id, 'sent_at': request.sent_at})
+    return {"status": "success", "seq": seq}
+
+@router.get('/process_status')
+def get_process_status():
+    """
+    获取服务进程的资源占用
+    
+    Returns:
+        进程号、累计 CPU 时间、常驻内存（无法获取时为 None）和线程数
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            rss_bytes = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        # 非 Linux 平台退化为峰值内存；Windows 没有 resource 模块，不提供内存数据
+        try:
+            import resource
+            rss_bytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            rss_bytes = None
+    return {
+        "status": "success",
+        "pid": os.getpid(),
+        "cpu_seconds": time.process_time(),
+        "rss_bytes": rss_bytes,
+        "threads": threading.active_count()
+    }
+
+@router.get('/window_status')
+def get_window_status():
+    """
+    获取转写窗口长度及实测实时率
+    
+    Returns:
+        当前窗口长度和调节状态
+    """
+    return {"status": "success", "window": transcription_service.window_controller.get_status()}
+
+@router.get('/preprocess_status')
+def get_preprocess_status():
+    """
+    获取当前预处理模式及每窗口耗时统计
+    
+    Returns:
+        预处理模式和耗时统计
+    """
+    return {"status": "success", "preprocess": transcription_service.get_preprocess_status()}
+
+@router.get('/feature_cache_status')
+def get_feature_cache_status():
+    """
+    获取 log-mel 特征缓存的复用情况
+    
+    Returns:
+        缓存状态
+    """
+    return {"status": "success", "feature_cache": feature_cache.get_status()}
+
+@router.post('/change_preprocess_mode')
+def change_preprocess_mode(request: PreprocessModeRequest):
+    """
+    切换音频预处理模式
+    
+    Args:
+        request: 包含预处理模式的请求对象
+    
+    Returns:
+        操作状态和消息
+    """
+    # 转写线程可能正在使用降噪器，运行中切换会与 reset 冲突
+    if transcription_service.running:
+        return {"status": "error", "message": "请先停止转写再切换预处理模式"}
+    return transcription_service.set_preprocess_mode(request.mode)
+
+@router.get('/preprocess_benchmark')
+def preprocess_benchmark(seconds: float = 3.0, runs: int = 20):
+    """
+    在合成带噪音频上对比各预处理模式的耗时和降噪效果
+    
+    Args:
+        seconds: 每个窗口的时长
+        runs: 每种模式的窗口数
+    
+    Returns:
+        各模式的基准测试结果
+    """
+    if not 0.5 <= seconds <= 30 or not 1 <= runs <= 200:
+        return {"status": "error", "message": "seconds 必须在 0.5 到 30 之间，runs 必须在 1 到 200 之间"}
+    return {"status": "success", "results": denoise.benchmark(seconds, runs)}
+
 @router.get('/anti_hallucination_config')
 def get_anti_hallucination_config():
     """
@@ -81,8 +256,10 @@ def get_anti_hallucination_config():
             "confidence_threshold": transcription_service.confidence_threshold,
             "energy_threshold": transcription_service.energy_threshold,
             "silence_threshold": transcription_service.silence_threshold,
-            "zcr_threshold": transcription_service.zcr_threshold
+            "zcr_threshold": transcription_service.zcr_threshold,
+            "adaptive_gating": ADAPTIVE_GATING_CONFIG["enabled"]
         },
+        "gating": transcription_service.get_gating_status(),
         "hallucination_patterns": HALLUCINATION_PATTERNS
     }
 
@@ -125,6 +302,10 @@ def update_anti_hallucination_config(request: AntiHallucinationConfigRequest):
             else:
                 return {"status": "error", "message": "silence_threshold 必须大于等于 0.0"}
         
+        if request.adaptive_gating is not None:
+            ADAPTIVE_GATING_CONFIG["enabled"] = request.adaptive_gating
+            updated_params.append(f"adaptive_gating={request.adaptive_gating}")
+        
         # 更新全局配置（影响新的 Whisper 转写调用）
         if request.temperature is not None:
             if 0.0 <= request.temperature <= 1.0:
@@ -141,6 +322,7 @@ def update_anti_hallucination_config(request: AntiHallucinationConfigRequest):
                 return {"status": "error", "message": "no_speech_threshold 必须在 0.0 到 1.0 之间"}
         
         if updated_params:
+            transcription_service.persist_tunable_config()
             message = f"已更新参数: {', '.join(updated_params)}"
         else:
             message = "没有参数被更新"
@@ -178,18 +360,30 @@ def reset_anti_hallucination_config():
         
         # 更新全局配置
         ANTI_HALLUCINATION_CONFIG.update(default_config)
+        ADAPTIVE_GATING_CONFIG["enabled"] = True
         
         # 更新转写服务配置
         transcription_service.energy_threshold = default_config["energy_threshold"]
         transcription_service.confidence_threshold = default_config["confidence_threshold"]
         transcription_service.silence_threshold = default_config["silence_threshold"]
         transcription_service.zcr_threshold = default_config["zcr_threshold"]
+        transcription_service.persist_tunable_config()
         
         return {"status": "success", "message": "反幻觉配置已重置为默认值"}
         
     except Exception as e:
         return {"status": "error", "message": f"重置配置失败: {str(e)}"}
 
+@router.get('/escalation_status')
+def get_escalation_status():
+    """
+    获取低置信度分段重解码的状态
+    
+    Returns:
+        重解码队列和处理统计
+    """
+    return {"status": "success", "escalation": escalation_service.get_status()}
+
 @router.get('/start')
 def start_listening():
     """
@@ -210,6 +404,21 @@ def stop_listening():
     """
     return transcription_service.stop()
 
+@router.get('/session_status')
+def get_session_status():
+    """
+    获取当前转写会话的运行状态，多进程模式下前端进程据此分配工作进程
+    
+    Returns:
+        是否正在转写、会话编号和音频来源
+    """
+    return {
+        "status": "success",
+        "running": transcription_service.running,
+        "session_id": transcription_service.session_id,
+        "source": transcription_service.source
+    }
+
 @router.get('/clear')
 def clear_transcription():
     """
@@ -233,6 +442,38 @@ def save_transcription():
         return FileResponse(file_path, filename="transcript_output.txt")
     return file_path
 
+@router.get('/search')
+def search_transcription(q: str, limit: int = 50):
+    """
+    全文检索当前会话的转写记录
+    
+    Args:
+        q: 查询文本，中文按二字组匹配连续片段，其他语言按词匹配
+        limit: 最多返回的分段数
+    
+    Returns:
+        命中的分段及其时间戳
+    """
+    limit = max(1, min(limit, 500))
+    started = time.perf_counter()
+    entries, total = transcription_service.search_index.search(q, limit)
+    return {
+        "status": "success",
+        "query": q,
+        "total": total,
+        "took_ms": (time.perf_counter() - started) * 1000,
+        "results": [
+            {
+                "id": entry["id"],
+                "text": entry["text"],
+                "timestamp": entry["timestamp"],
+                "start_ms": entry["start_ms"],
+                "end_ms": entry["end_ms"]
+            }
+            for entry in entries
+        ]
+    }
+
 @router.post('/set_timestamp')
 def set_timestamp_display(request: TimestampRequest):
     """
@@ -1,37 +1,159 @@
 """
 WebSocket相关的API端点
 """
+import asyncio
+import numpy as np
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from app.services.transcription import transcription_service
 from app.services.whisper import whisper_service
+from app.services.broadcast import broadcaster, Subscriber
 from app.core.logging import logger
+from app.config import WEBSOCKET_CONFIG, SAMPLE_RATE
 
 router = APIRouter()
 
+def negotiate(websocket: WebSocket):
+    """
+    根据查询参数协商推送协议和合并间隔
+    
+    Args:
+        websocket: WebSocket连接对象
+    
+    Returns:
+        tuple: (protocol, flush_interval) 协议名称和合并间隔（秒）
+    """
+    protocol = websocket.query_params.get("protocol", WEBSOCKET_CONFIG["default_protocol"])
+    if protocol not in WEBSOCKET_CONFIG["protocols"]:
+        protocol = WEBSOCKET_CONFIG["default_protocol"]
+    
+    flush_ms = WEBSOCKET_CONFIG["default_flush_ms"][protocol]
+    try:
+        flush_ms = int(websocket.query_params.get("flush_ms", flush_ms))
+    except ValueError:
+        pass
+    flush_ms = max(0, min(flush_ms, WEBSOCKET_CONFIG["max_flush_ms"]))
+    return protocol, flush_ms / 1000
+
+def parse_since(websocket: WebSocket):
+    """
+    解析续传游标
+    
+    Args:
+        websocket: WebSocket连接对象
+    
+    Returns:
+        int: 客户端最后收到的事件序号，未提供或无效时为 None
+    """
+    try:
+        since = int(websocket.query_params["since"])
+    except (KeyError, ValueError):
+        return None
+    return max(since, 0)
+
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """
     处理WebSocket连接
     
+    查询参数 protocol 可选 json（默认，网页使用）、compact 或 binary，
+    flush_ms 指定合并推送的间隔。断线重连时传入 since（最后收到的事件序号）和
+    boot（上次连接状态消息中的启动标识），服务端先补发之后缺失的转写分段，
+    再发送连接状态消息并切换为实时推送。
+    
     Args:
         websocket: WebSocket连接对象
     """
     await websocket.accept()
-    transcription_service.connected_websockets.add(websocket)
+    protocol, flush_interval = negotiate(websocket)
+    subscriber = Subscriber(websocket, protocol, flush_interval)
+    
+    since = parse_since(websocket)
+    # 游标属于之前的服务进程时序号已重新开始，按从头续传处理
+    if since is not None and websocket.query_params.get("boot", broadcaster.boot_id) != broadcaster.boot_id:
+        since = 0
+    
+    # 注册、取快照和补发之间没有 await，期间不会有实时事件插入
+    broadcaster.register(subscriber)
+    if since is not None:
+        replay, seq = transcription_service.replay_since(since)
+    else:
+        replay, seq = [], broadcaster.seq
+    
+    # 先补发缺失的事件，最后发送携带快照序号的连接状态消息：
+    # 补发中途断线时客户端的游标只前进到已收到的事件
+    for event in replay:
+        subscriber.enqueue(event)
+    subscriber.enqueue((seq, "status", {
+        'status': 'connected',
+        'boot': broadcaster.boot_id,
+        'model': whisper_service.model_name,
+        'language': transcription_service.current_language,
+        'protocol': protocol,
+        'flush_ms': int(flush_interval * 1000),
+        'replayed': len(replay)
+    }))
+    subscriber.floor_seq = seq
+    sender = asyncio.create_task(subscriber.run())
     
     try:
-        await websocket.send_json({
-            "event": "status",
-            "data": {
-                'status': 'connected',
-                'model': whisper_service.model_name,
-                'language': transcription_service.current_language
-            }
-        })  
         # 保持连接
         while True:
             data = await websocket.receive_text()
     except WebSocketDisconnect:
         logger.info("客户端已断开连接")
     finally:
-        transcription_service.connected_websockets.remove(websocket)
\ No newline at end of file
+        broadcaster.unregister(subscriber)
+        sender.cancel()
+
+@router.websocket("/ws/audio")
+async def audio_stream_endpoint(websocket: WebSocket):
+    """
+    音频流会话：客户端推送音频代替本机麦克风
+    
+    连接建立后开始一个转写会话，之后每个二进制帧是一段 16kHz 单声道 PCM，
+    查询参数 format 可选 s16（默认，int16 小端）或 f32（float32 小端）。
+    断开连接时结束会话。转写结果照常通过 /ws 推送。
+    
+    Args:
+        websocket: WebSocket连接对象
+    """
+    await websocket.accept()
+    sample_format = websocket.query_params.get("format", "s16")
+    if sample_format not in ("s16", "f32"):
+        await websocket.send_json({"event": "error", "data": {"message": f"不支持的音频格式: {sample_format}"}})
+        await websocket.close()
+        return
+    
+    result = transcription_service.start(source="stream")
+    if result["status"] != "started":
+        message = result.get("message", "已有转写会话在运行")
+        await websocket.send_json({"event": "error", "data": {"message": message}})
+        await websocket.close()
+        return
+    session_id = transcription_service.session_id
+    await websocket.send_json({"event": "status", "data": {
+        "status": "started",
+        "session_id": session_id,
+        "sample_rate": SAMPLE_RATE,
+        "format": sample_format
+    }})
+    
+    try:
+        while True:
+            data = await websocket.receive_bytes()
+            if not transcription_service.running or transcription_service.session_id != session_id:
+                # 会话已通过 /stop 结束
+                await websocket.close()
+                return
+            if sample_format == "s16":
+                samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+            else:
+                samples = np.frombuffer(data, dtype="<f4").astype(np.float32)
+            transcription_service.feed_audio(samples)
+    except WebSocketDisconnect:
+        logger.info("音频流客户端已断开连接")
+    except Exception as e:
+        logger.error(f"音频流处理失败: {str(e)}")
+    finally:
+        if transcription_service.session_id == session_id:
+            transcription_service.stop()
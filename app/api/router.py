@@ -2,7 +2,7 @@
 API路由注册
 """
 from fastapi import APIRouter
-from app.api.endpoints import audio, transcription, websocket
+from app.api.endpoints import audio, transcription, websocket, sessions
 
 # 创建主路由
 api_router = APIRouter()
@@ -10,4 +10,5 @@ api_router = APIRouter()
 # 注册各模块路由
 api_router.include_router(audio.router, tags=["audio"])
 api_router.include_router(transcription.router, tags=["transcription"])
-api_router.include_router(websocket.router, tags=["websocket"])
\ No newline at end of file
+api_router.include_router(websocket.router, tags=["websocket"])
+api_router.include_router(sessions.router, tags=["sessions"])
\ No newline at end of file
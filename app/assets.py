@@ -0,0 +1,253 @@
+"""
+静态资源构建与发布模块
+
+构建: python -m app.assets
+
+把 static/ 下的文件复制到 dist/，文件名带上内容哈希（CSS 中引用的资源同步改名），
+文本类文件额外生成 gzip 和 brotli 预压缩版本，并写出 manifest.json 映射表。
+运行时 /assets 下的文件按 Accept-Encoding 直接发送预压缩版本，并带上长期缓存头；
+未执行构建时页面继续引用 /static 下的原始文件。
+"""
+import os
+import re
+import gzip
+import json
+import shutil
+import hashlib
+import mimetypes
+from starlette.datastructures import Headers
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import StaticFiles, NotModifiedResponse
+from app.core.logging import logger
+from app.config import ASSET_CONFIG
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# CSS 中的 url() 引用
+CSS_URL_PATTERN = re.compile(r"""url\(\s*(["']?)(\./)?([^"')?#]+)([?#][^"')]*)?\1\s*\)""")
+
+# 预压缩版本的内容编码和文件后缀，按优先级排列
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+def hashed_name(name, content):
+    """
+    生成带内容哈希的文件名
+
+    Args:
+        name: 原文件名
+        content: 文件内容
+
+    Returns:
+        str: 如 bootstrap.min.3f2a9c1d0b.css
+    """
+    digest = hashlib.blake2b(content, digest_size=8).hexdigest()[:ASSET_CONFIG["hash_length"]]
+    stem, ext = os.path.splitext(name)
+    return f"{stem}.{digest}{ext}"
+
+def rewrite_css(content, mapping):
+    """
+    把 CSS 中对其他资源的引用替换为带哈希的文件名
+
+    Args:
+        content: CSS 内容
+        mapping: 原文件名 -> 带哈希的文件名
+
+    Returns:
+        bytes: 替换后的 CSS
+    """
+    def replace(match):
+        quote, _, name, _ = match.groups()
+        if name not in mapping:
+            return match.group(0)
+        return f"url({quote}./{mapping[name]}{quote})"
+
+    return CSS_URL_PATTERN.sub(replace, content.decode("utf-8")).encode("utf-8")
+
+def write_compressed(path, content):
+    """
+    写出预压缩版本，压缩后不比原文件小时不写
+
+    Args:
+        path: 原文件路径
+        content: 原文件内容
+    """
+    variants = [(".gz", gzip.compress(content, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", brotli.compress(content, quality=11)))
+    for suffix, data in variants:
+        if len(data) < len(content):
+            with open(path + suffix, "wb") as f:
+                f.write(data)
+
+def build():
+    """
+    构建静态资源
+
+    Returns:
+        dict: 原文件名 -> 带哈希的文件名
+    """
+    source_dir = ASSET_CONFIG["source_dir"]
+    output_dir = ASSET_CONFIG["output_dir"]
+    if os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+    os.makedirs(output_dir)
+
+    # 先处理被引用的资源，CSS 改写引用后再计算自身的哈希
+    names = sorted(
+        name for name in os.listdir(source_dir) if os.path.isfile(os.path.join(source_dir, name))
+    )
+    names.sort(key=lambda name: name.endswith(".css"))
+
+    mapping = {}
+    for name in names:
+        with open(os.path.join(source_dir, name), "rb") as f:
+            content = f.read()
+        if name.endswith(".css"):
+            content = rewrite_css(content, mapping)
+        mapping[name] = hashed_name(name, content)
+        path = os.path.join(output_dir, mapping[name])
+        with open(path, "wb") as f:
+            f.write(content)
+        if os.path.splitext(name)[1] in ASSET_CONFIG["compress_types"]:
+            write_compressed(path, content)
+
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(mapping, f, indent=2)
+    if brotli is None:
+        logger.warning("未安装 brotli，只生成 gzip 预压缩文件")
+    logger.info(f"已构建 {len(mapping)} 个静态资源到 {output_dir}")
+    return mapping
+
+def load_manifest():
+    """
+    读取构建产物的映射表
+
+    Returns:
+        dict: 原文件名 -> 带哈希的文件名，未构建时为空
+    """
+    path = os.path.join(ASSET_CONFIG["output_dir"], "manifest.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def negotiate_encoding(headers, available):
+    """
+    按客户端的 Accept-Encoding 选择内容编码
+
+    Args:
+        headers: 请求头
+        available: 可用的编码集合
+
+    Returns:
+        str: 选中的编码，不压缩时为 None
+    """
+    accepted = {
+        item.split(";")[0].strip()
+        for item in headers.get("accept-encoding", "").split(",")
+        if not item.strip().endswith("q=0")
+    }
+    for encoding, _ in ENCODINGS:
+        if encoding in accepted and encoding in available:
+            return encoding
+    return None
+
+class AssetFiles(StaticFiles):
+    """
+    带哈希的静态资源
+
+    文件名随内容变化，可以永久缓存；客户端支持时直接发送构建时生成的
+    brotli / gzip 文件，不在请求时压缩。ETag 由 FileResponse 按实际发送的文件生成。
+    """
+
+    async def get_response(self, path, scope):
+        """按 Accept-Encoding 返回预压缩版本"""
+        request_headers = Headers(scope=scope)
+        cache_headers = {
+            "Cache-Control": f"public, max-age={ASSET_CONFIG['max_age']}, immutable",
+            "Vary": "Accept-Encoding"
+        }
+        for encoding, suffix in ENCODINGS:
+            if negotiate_encoding(request_headers, {encoding}) is None:
+                continue
+            full_path, stat_result = await run_in_threadpool(self.lookup_path, path + suffix)
+            if stat_result is None:
+                continue
+            media_type, _ = mimetypes.guess_type(path)
+            response = FileResponse(
+                full_path, stat_result=stat_result, media_type=media_type,
+                headers={**cache_headers, "Content-Encoding": encoding}
+            )
+            if self.is_not_modified(response.headers, request_headers):
+                return NotModifiedResponse(response.headers)
+            return response
+
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers.update(cache_headers)
+        return response
+
+class CachedPage:
+    """
+    只渲染一次的页面
+
+    模板在首次请求时渲染，同时生成压缩版本和 ETag；之后的请求直接返回缓存内容，
+    客户端带着相同的 ETag 重新验证时返回 304。页面引用的资源带哈希，
+    页面本身使用 no-cache，重新构建资源后客户端能及时拿到新的引用。
+    """
+
+    def __init__(self, templates, name):
+        """
+        初始化页面缓存
+
+        Args:
+            templates: Jinja2Templates 实例
+            name: 模板名
+        """
+        self.templates = templates
+        self.name = name
+        self.variants = None
+        self.etag = None
+
+    def render(self):
+        """渲染模板并生成各编码的版本"""
+        manifest = load_manifest()
+
+        def asset_url(name):
+            if name in manifest:
+                return f"{ASSET_CONFIG['url_prefix']}/{manifest[name]}"
+            return f"/static/{name}"
+
+        html = self.templates.get_template(self.name).render(asset_url=asset_url).encode("utf-8")
+        variants = {None: html, "gzip": gzip.compress(html, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants["br"] = brotli.compress(html, quality=11)
+        self.etag = f'"{hashlib.blake2b(html, digest_size=8).hexdigest()}"'
+        self.variants = variants
+
+    def response(self, request):
+        """
+        生成页面响应
+
+        Args:
+            request: 请求对象
+
+        Returns:
+            Response: 页面或 304 响应
+        """
+        if self.variants is None:
+            self.render()
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if self.etag in request.headers.get("if-none-match", ""):
+            return Response(status_code=304, headers=headers)
+        encoding = negotiate_encoding(request.headers, set(self.variants) - {None})
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], media_type="text/html", headers=headers)
+
+if __name__ == '__main__':
+    build()
@@ -0,0 +1,564 @@
+"""
+多进程部署模块
+
+用法: python -m app.cluster --workers 4
+
+前端进程监听 HOST:PORT，按会话键把 HTTP 和 WebSocket 请求转发到所属的工作进程；
+每个工作进程是一个完整的应用实例（独立的模型、转写服务和广播服务），
+监听本地 Unix 套接字，推理线程数按工作进程数平分。同一会话的所有请求始终落在同一个工作进程上。
+"""
+import os
+import json
+import time
+import uuid
+import zlib
+import asyncio
+import argparse
+import threading
+import multiprocessing
+import h11
+import uvicorn
+from starlette.requests import HTTPConnection
+from starlette.responses import JSONResponse
+from starlette.websockets import WebSocket
+from websockets.asyncio.client import unix_connect
+from websockets.exceptions import ConnectionClosed
+from app.core.logging import logger
+from app.config import CLUSTER_CONFIG, MODEL_CPU_THREADS, HOST, PORT
+
+# 逐跳头部，不转发
+HOP_BY_HOP = {
+    b"connection", b"keep-alive", b"proxy-authenticate", b"proxy-authorization",
+    b"te", b"trailer", b"transfer-encoding", b"upgrade", b"content-length"
+}
+
+# 开始转写会话的请求：(scope 类型, 路径)
+SESSION_STARTS = {("http", "/start"), ("websocket", "/ws/audio")}
+
+async def fetch_json(socket_path, path):
+    """
+    通过 Unix 套接字向工作进程发送 GET 请求并解析 JSON 响应
+
+    Args:
+        socket_path: 工作进程的套接字路径
+        path: 请求路径
+
+    Returns:
+        dict: 响应内容
+    """
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_unix_connection(socket_path), CLUSTER_CONFIG["connect_timeout"]
+    )
+    conn = h11.Connection(h11.CLIENT)
+    body = b""
+    try:
+        writer.write(conn.send(h11.Request(
+            method="GET", target=path, headers=[(b"host", b"localhost"), (b"connection", b"close")]
+        )))
+        writer.write(conn.send(h11.EndOfMessage()))
+        await writer.drain()
+        while True:
+            event = conn.next_event()
+            if event is h11.NEED_DATA:
+                conn.receive_data(await reader.read(65536))
+            elif isinstance(event, h11.Data):
+                body += bytes(event.data)
+            elif isinstance(event, (h11.EndOfMessage, h11.ConnectionClosed)):
+                break
+    finally:
+        writer.close()
+    return json.loads(body)
+
+def run_worker(index, socket_path, cpu_threads):
+    """
+    工作进程入口
+
+    Args:
+        index: 工作进程序号
+        socket_path: 监听的 Unix 套接字路径
+        cpu_threads: 模型推理线程数
+    """
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    # 应用模块在 uvicorn 启动时才导入，创建模型时读取该变量
+    os.environ["WHISPRRT_CPU_THREADS"] = str(cpu_threads)
+    logger.info(f"工作进程 {index} 启动，监听 {socket_path}，推理线程数 {cpu_threads}")
+    uvicorn.run("app.main:app", uds=socket_path)
+
+class WorkerPool:
+    """
+    工作进程池
+
+    负责启动、监控和重启工作进程，并维护会话到工作进程的亲和表。
+    每个工作进程只有一个转写服务，同一时间只能服务一个转写会话：新会话键只分配给
+    没有在转写的工作进程（其中会话键最少的一个），全部在转写时拒绝；已分配的会话键
+    所在进程被其他会话键占用时，改派到空闲进程，避免看到和清空别人的转写记录。
+    没有会话键的请求按客户端地址固定路由，不进入亲和表。
+    """
+
+    def __init__(self, count):
+        """
+        初始化进程池
+
+        Args:
+            count: 工作进程数量
+        """
+        self.count = count
+        self.socket_dir = os.path.abspath(CLUSTER_CONFIG["socket_dir"])
+        self.context = multiprocessing.get_context("spawn")
+        self.processes = [None] * count
+        self.restarts = [0] * count
+        # 各工作进程平分 CPU，避免推理线程总数超过核数
+        self.cpu_threads = max(1, min(MODEL_CPU_THREADS, (os.cpu_count() or MODEL_CPU_THREADS) // count))
+        self.affinity = {}  # 会话键 -> [工作进程序号, 最近访问时间]
+        self.running = [None] * count  # 最近一次查询到的转写状态，None 表示未知或不可达
+        self.owners = [None] * count  # 开始当前转写会话的会话键
+        self.stopping = threading.Event()
+        self.supervisor = None
+
+    def socket_path(self, index):
+        """
+        工作进程的套接字路径
+
+        Args:
+            index: 工作进程序号
+
+        Returns:
+            str: 套接字路径
+        """
+        return os.path.join(self.socket_dir, f"worker-{index}.sock")
+
+    def spawn(self, index):
+        """
+        启动一个工作进程
+
+        Args:
+            index: 工作进程序号
+        """
+        process = self.context.Process(
+            target=run_worker, args=(index, self.socket_path(index), self.cpu_threads),
+            name=f"whisprrt-worker-{index}"
+        )
+        process.start()
+        self.processes[index] = process
+
+    def start(self):
+        """启动所有工作进程和监控线程"""
+        os.makedirs(self.socket_dir, exist_ok=True)
+        for index in range(self.count):
+            self.spawn(index)
+        self.supervisor = threading.Thread(target=self.supervise, daemon=True)
+        self.supervisor.start()
+        logger.info(f"已启动 {self.count} 个工作进程")
+
+    def supervise(self):
+        """监控线程：重启异常退出的工作进程"""
+        while not self.stopping.wait(CLUSTER_CONFIG["restart_delay"]):
+            for index, process in enumerate(self.processes):
+                if not process.is_alive() and not self.stopping.is_set():
+                    logger.warning(f"工作进程 {index} 已退出 (exitcode={process.exitcode})，正在重启")
+                    self.restarts[index] += 1
+                    self.running[index] = None
+                    self.owners[index] = None
+                    self.spawn(index)
+
+    def stop(self):
+        """停止所有工作进程"""
+        self.stopping.set()
+        for process in self.processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for index, process in enumerate(self.processes):
+            if process is None:
+                continue
+            process.join(timeout=10)
+            if process.is_alive():
+                process.kill()
+            if os.path.exists(self.socket_path(index)):
+                os.remove(self.socket_path(index))
+
+    async def refresh(self, indices=None):
+        """
+        查询工作进程的转写状态
+
+        Args:
+            indices: 要查询的工作进程序号，默认全部
+        """
+        indices = range(self.count) if indices is None else indices
+
+        async def query(index):
+            try:
+                status = await fetch_json(self.socket_path(index), "/session_status")
+                self.running[index] = bool(status.get("running"))
+            except (OSError, asyncio.TimeoutError, h11.ProtocolError, ValueError) as e:
+                logger.debug(f"查询工作进程 {index} 状态失败: {str(e)}")
+                self.running[index] = None
+            if not self.running[index]:
+                self.owners[index] = None
+
+        await asyncio.gather(*(query(index) for index in indices))
+
+    def claim(self, index, key):
+        """
+        记录开始转写会话的会话键，工作进程已在转写时不改变归属
+
+        Args:
+            index: 工作进程序号
+            key: 会话键，无会话键的请求为 None
+        """
+        if not self.running[index]:
+            self.owners[index] = key
+
+    def idle_workers(self):
+        """
+        可以接收新会话的工作进程：存活且确认没有在转写
+
+        Returns:
+            list: 工作进程序号
+        """
+        return [
+            index for index, process in enumerate(self.processes)
+            if process is not None and process.is_alive() and self.running[index] is False
+        ]
+
+    def pick(self, key):
+        """
+        获取会话所属的工作进程，新会话分配给没有在转写、会话键最少的进程
+
+        调用前应先 refresh，使转写状态是最新的。
+
+        Args:
+            key: 会话键
+
+        Returns:
+            int: 工作进程序号，所有工作进程都在转写时为 None
+        """
+        now = time.time()
+        entry = self.affinity.get(key)
+        if entry is not None:
+            entry[1] = now
+            index = entry[0]
+            owner = self.owners[index]
+            # 所在进程正在为其他会话键转写，有空闲进程时改派
+            if not (self.running[index] and owner is not None and owner != key) or not self.idle_workers():
+                return index
+            del self.affinity[key]
+
+        # 清理长时间未访问的会话
+        expire_before = now - CLUSTER_CONFIG["session_ttl_hours"] * 3600
+        for stale in [k for k, (_, seen) in self.affinity.items() if seen < expire_before]:
+            del self.affinity[stale]
+
+        idle = self.idle_workers()
+        if not idle:
+            return None
+        counts = self.session_counts()
+        index = min(idle, key=counts.__getitem__)
+        self.affinity[key] = [index, now]
+        return index
+
+    def pick_unkeyed(self, client):
+        """
+        获取无会话键请求的工作进程：按客户端地址哈希，同一客户端总是落在同一个进程，
+        不记录亲和，不影响按会话数的分配
+
+        Args:
+            client: 客户端地址
+
+        Returns:
+            int: 工作进程序号
+        """
+        return zlib.crc32(client.encode()) % self.count
+
+    def session_counts(self):
+        """
+        统计每个工作进程的会话数
+
+        Returns:
+            list: 按工作进程序号排列的会话数
+        """
+        counts = [0] * self.count
+        for index, _ in self.affinity.values():
+            counts[index] += 1
+        return counts
+
+    def get_status(self):
+        """
+        获取进程池状态
+
+        Returns:
+            dict: 状态信息
+        """
+        counts = self.session_counts()
+        return {
+            "cpu_threads": self.cpu_threads,
+            "workers": [
+                {
+                    "index": index,
+                    "pid": process.pid if process else None,
+                    "alive": bool(process and process.is_alive()),
+                    "socket": self.socket_path(index),
+                    "sessions": counts[index],
+                    "running": self.running[index],
+                    "restarts": self.restarts[index]
+                }
+                for index, process in enumerate(self.processes)
+            ],
+            "sessions": len(self.affinity)
+        }
+
+class FrontProxy:
+    """
+    前端路由进程（ASGI 应用）
+
+    会话键依次取自查询参数、请求头和 Cookie。都没有时，浏览器打开页面会分配一个新键
+    并通过 Cookie 下发，之后页面发出的请求和 WebSocket 连接都会带上它；
+    其他请求（如 curl 调用的 /start、/stop）按客户端地址固定路由，不分配会话。
+    经由 /start 和 /ws/audio 开始的转写会话记录在对应的会话键名下。
+    """
+
+    def __init__(self, pool):
+        """
+        初始化前端路由
+
+        Args:
+            pool: 工作进程池
+        """
+        self.pool = pool
+
+    def session_key(self, connection):
+        """
+        解析请求的会话键
+
+        Args:
+            connection: 请求连接对象
+
+        Returns:
+            tuple: (key, assigned) 会话键以及是否为新分配，无会话键时 key 为 None
+        """
+        key = connection.query_params.get(CLUSTER_CONFIG["session_param"]) \
+            or connection.headers.get(CLUSTER_CONFIG["session_header"]) \
+            or connection.cookies.get(CLUSTER_CONFIG["session_cookie"])
+        if key:
+            return key, False
+        if self.is_page(connection):
+            return uuid.uuid4().hex, True
+        return None, False
+
+    @staticmethod
+    def is_page(connection):
+        """
+        判断是否为浏览器打开页面的请求
+
+        Args:
+            connection: 请求连接对象
+
+        Returns:
+            bool: 是否为页面请求
+        """
+        return connection.scope["type"] == "http" and connection.scope["method"] == "GET" \
+            and "text/html" in connection.headers.get("accept", "")
+
+    async def __call__(self, scope, receive, send):
+        """ASGI 入口"""
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+
+        if scope["type"] == "http" and scope["path"] == "/cluster_status":
+            await JSONResponse(self.pool.get_status())(scope, receive, send)
+            return
+
+        connection = HTTPConnection(scope)
+        key, assigned = self.session_key(connection)
+        starts_session = (scope["type"], scope["path"]) in SESSION_STARTS
+        if key is None:
+            index = self.pool.pick_unkeyed(connection.client.host if connection.client else "")
+        else:
+            # 打开页面和开始转写时按工作进程的最新状态分配，其余请求沿用已有分配
+            if key not in self.pool.affinity or self.is_page(connection) or starts_session:
+                await self.pool.refresh()
+            index = self.pool.pick(key)
+            if index is None:
+                await self.reject(scope, receive, send)
+                return
+        if starts_session:
+            await self.pool.refresh([index])
+            self.pool.claim(index, key)
+        socket_path = self.pool.socket_path(index)
+        if scope["type"] == "websocket":
+            await self.proxy_websocket(scope, receive, send, socket_path)
+        else:
+            await self.proxy_http(scope, receive, send, socket_path, key if assigned else None)
+
+    async def reject(self, scope, receive, send):
+        """
+        所有工作进程都在转写时拒绝新会话
+
+        Args:
+            scope: ASGI scope
+            receive: ASGI receive
+            send: ASGI send
+        """
+        message = "所有工作进程都在转写中，请稍后再试"
+        if scope["type"] == "websocket":
+            await WebSocket(scope, receive, send).close(code=1013, reason="all workers busy")
+        else:
+            await JSONResponse({"status": "error", "message": message}, status_code=503)(scope, receive, send)
+
+    async def proxy_http(self, scope, receive, send, socket_path, new_key):
+        """
+        转发一个 HTTP 请求
+
+        Args:
+            scope: ASGI scope
+            receive: ASGI receive
+            send: ASGI send
+            socket_path: 目标工作进程的套接字路径
+            new_key: 新分配的会话键，需要通过 Cookie 下发；已有会话键时为 None
+        """
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_unix_connection(socket_path), CLUSTER_CONFIG["connect_timeout"]
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            logger.error(f"连接工作进程失败: {str(e)}")
+            await JSONResponse({"error": "工作进程不可用"}, status_code=502)(scope, receive, send)
+            return
+
+        conn = h11.Connection(h11.CLIENT)
+        target = scope.get("raw_path") or scope["path"].encode()
+        if scope["query_string"]:
+            target += b"?" + scope["query_string"]
+        headers = [(name, value) for name, value in scope["headers"] if name not in HOP_BY_HOP]
+        if not any(name == b"host" for name, _ in headers):
+            headers.append((b"host", b"localhost"))
+        if scope.get("client"):
+            headers.append((b"x-forwarded-for", scope["client"][0].encode()))
+        headers += [(b"content-length", str(len(body)).encode()), (b"connection", b"close")]
+
+        started = False
+        try:
+            writer.write(conn.send(h11.Request(method=scope["method"], target=target, headers=headers)))
+            if body:
+                writer.write(conn.send(h11.Data(data=body)))
+            writer.write(conn.send(h11.EndOfMessage()))
+            await writer.drain()
+
+            while True:
+                event = conn.next_event()
+                if event is h11.NEED_DATA:
+                    conn.receive_data(await reader.read(65536))
+                elif isinstance(event, h11.Response):
+                    response_headers = [(name, value) for name, value in event.headers if name not in HOP_BY_HOP]
+                    if new_key:
+                        cookie = f"{CLUSTER_CONFIG['session_cookie']}={new_key}; Path=/; SameSite=Lax; HttpOnly"
+                        response_headers.append((b"set-cookie", cookie.encode()))
+                    await send({"type": "http.response.start", "status": event.status_code, "headers": response_headers})
+                    started = True
+                elif isinstance(event, h11.Data):
+                    await send({"type": "http.response.body", "body": bytes(event.data), "more_body": True})
+                elif isinstance(event, (h11.EndOfMessage, h11.ConnectionClosed)):
+                    break
+            await send({"type": "http.response.body", "body": b""})
+        except (OSError, h11.ProtocolError) as e:
+            logger.error(f"转发请求失败: {str(e)}")
+            if not started:
+                await JSONResponse({"error": "工作进程响应异常"}, status_code=502)(scope, receive, send)
+        finally:
+            writer.close()
+
+    async def proxy_websocket(self, scope, receive, send, socket_path):
+        """
+        转发一个 WebSocket 连接，双向透传文本和二进制帧
+
+        Args:
+            scope: ASGI scope
+            receive: ASGI receive
+            send: ASGI send
+            socket_path: 目标工作进程的套接字路径
+        """
+        websocket = WebSocket(scope, receive, send)
+        uri = f"ws://localhost{scope['path']}"
+        if scope["query_string"]:
+            uri += "?" + scope["query_string"].decode("latin-1")
+        try:
+            upstream = await unix_connect(
+                socket_path, uri, open_timeout=CLUSTER_CONFIG["connect_timeout"], max_size=None
+            )
+        except Exception as e:
+            logger.error(f"连接工作进程失败: {str(e)}")
+            await websocket.close(code=1011)
+            return
+        await websocket.accept()
+
+        async def client_to_worker():
+            try:
+                while True:
+                    message = await websocket.receive()
+                    if message["type"] == "websocket.disconnect":
+                        return
+                    if message.get("text") is not None:
+                        await upstream.send(message["text"])
+                    elif message.get("bytes") is not None:
+                        await upstream.send(message["bytes"])
+            except ConnectionClosed:
+                pass
+
+        async def worker_to_client():
+            try:
+                async for message in upstream:
+                    if isinstance(message, str):
+                        await websocket.send_text(message)
+                    else:
+                        await websocket.send_bytes(message)
+            except (ConnectionClosed, RuntimeError) as e:
+                logger.info(f"WebSocket转发结束: {str(e)}")
+
+        tasks = [asyncio.create_task(client_to_worker()), asyncio.create_task(worker_to_client())]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await upstream.close()
+            try:
+                await websocket.close()
+            except Exception:
+                # 客户端已断开
+                pass
+
+def main():
+    """多进程模式入口"""
+    parser = argparse.ArgumentParser(description="WhisprRT 多进程部署")
+    parser.add_argument("--workers", type=int, default=2, help="工作进程数量")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    pool = WorkerPool(max(args.workers, 1))
+    pool.start()
+    try:
+        logger.info(f"前端路由进程监听 {args.host}:{args.port}")
+        uvicorn.run(FrontProxy(pool), host=args.host, port=args.port)
+    except Exception as e:
+        logger.error(f"前端路由进程启动失败: {str(e)}")
+    finally:
+        pool.stop()
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,17 @@ SAMPLE_RATE = 16000
 BLOCK_SIZE = 2000  # 从4000减少到2000，减少音频块延迟
 BUFFER_SECONDS = 3  # 从5秒减少到3秒，这是最大的延迟优化
 
+# 窗口长度自动调节配置：根据实测推理耗时在上下限内调整窗口长度
+WINDOW_CONTROL_CONFIG = {
+    "enabled": True,
+    "min_seconds": 1.5,  # 窗口长度下限
+    "max_seconds": 8.0,  # 窗口长度上限
+    "target_latency": 4.0,  # 目标延迟：窗口长度 + 推理耗时
+    "max_rtf": 0.8,  # 实时率（推理耗时/音频时长）超过此值时优先加长窗口，避免积压
+    "smoothing": 0.3,  # 实时率指数平均的新样本权重
+    "max_step": 0.5,  # 每次调整的最大幅度（秒）
+}
+
 # 模型配置
 AVAILABLE_MODELS = {
     "tiny": "最小模型，速度最快，精度最低",
@@ -14,8 +25,26 @@ AVAILABLE_MODELS = {
     "small": "小型模型，速度和精度平衡",
     "large-v3-turbo": "大型模型，精度高，接近tiny的速度"
 }
+# 各模型的 mel 维度，特征缓存据此判断重解码能否复用实时模型的特征
+MODEL_MEL_BINS = {
+    "tiny": 80,
+    "base": 80,
+    "small": 80,
+    "large-v3-turbo": 128
+}
 DEFAULT_MODEL = "small"
+MODEL_CPU_THREADS = 8  # 推理线程数；多进程模式下由前端进程按工作进程数平分
 DEFAULT_LANGUAGE = "zh"
+AUTO_LANGUAGE = "auto"  # 自动检测语言，每个会话只检测一次并缓存
+
+# 自动语言检测配置
+LANGUAGE_DETECTION_CONFIG = {
+    "min_probability": 0.7,  # 首次检测结果达到此概率才缓存
+    "switch_probability": 0.8,  # 复检时切换到新语言所需的概率
+    "recheck_seconds": 60,  # 定期复检间隔
+    "low_confidence": 0.45,  # 分段平均置信度低于此值视为可能换了语言
+    "low_confidence_windows": 3,  # 连续多少个低置信度窗口后触发复检
+}
 
 # 反幻觉配置 - 速度优化
 ANTI_HALLUCINATION_CONFIG = {
@@ -32,6 +61,59 @@ ANTI_HALLUCINATION_CONFIG = {
     "zcr_threshold": 0.15,  # 从0.1放宽到0.15
 }
 
+# 音频预处理配置
+PREPROCESS_MODES = {
+    "spectral_gate": "STFT 谱门限降噪，持续估计噪声底",
+    "highpass": "旧版差分高通 + 峰值归一化",
+    "none": "不做预处理",
+}
+PREPROCESS_CONFIG = {
+    "mode": "spectral_gate",
+    "n_fft": 512,  # STFT 帧长，帧移固定为一半
+    "noise_percentile": 10,  # 每个窗口内能量最低的这部分帧作为噪声底观测
+    "noise_smoothing": 0.9,  # 噪声底上升时的平滑系数，下降时立即跟随
+    "over_subtraction": 2.0,  # 噪声过减系数
+    "gain_floor": 0.1,  # 最小幅度增益，避免音乐噪声
+    "target_peak": 0.9,  # 归一化目标峰值
+    "max_gain": 10.0,  # 归一化最大增益，避免把安静窗口的噪声放大
+}
+
+# 流式 VAD 配置：语音区间只计算一次，同时用于静音跳过和模型裁剪
+VAD_CONFIG = {
+    "threshold": 0.5,  # Silero VAD 语音概率阈值
+    "min_silence_duration_ms": 500,  # 最小静音持续时间
+    "speech_pad_ms": 400,  # 语音填充时间
+    "chunk_seconds": 1.0,  # 累积多少新音频后增量运行一次 VAD
+    "context_seconds": 0.5,  # 每次运行时带上的历史音频，用于衔接跨块的语音
+}
+
+# 低置信度分段重解码配置
+ESCALATION_CONFIG = {
+    "enabled": True,
+    "model": "large-v3-turbo",  # 重解码使用的更大模型
+    "beam_size": 5,  # 重解码使用完整束搜索
+    "min_confidence": 0.2,  # 低于此置信度视为噪音，不值得重解码
+    "padding_seconds": 0.3,  # 截取分段音频时两侧补齐的时长
+    "max_pending": 20,  # 待重解码队列上限，超出直接丢弃
+}
+
+# 自适应噪声底配置：按会话持续估计环境噪声，动态调整 energy/silence/zcr 门限
+ADAPTIVE_GATING_CONFIG = {
+    "enabled": True,
+    "frame_ms": 20,  # 估计噪声底时的分帧长度
+    "floor_percentile": 10,  # 每个窗口内能量最低的这部分帧视为环境噪声
+    "rise_rate": 0.05,  # 噪声底上升时的跟随速度（慢，避免被语音拉高）
+    "fall_rate": 0.5,  # 噪声底下降时的跟随速度（快，环境变安静时立即放宽）
+    "warmup_windows": 2,  # 观测多少个窗口后才启用自适应门限
+    "silence_margin": 1.5,  # silence_threshold = 噪声底能量 * 该系数
+    "energy_margin": 2.5,  # energy_threshold = 噪声底能量 * 该系数
+    "zcr_margin": 1.2,  # zcr_threshold = 噪声零交叉率 * 该系数
+    "min_energy": 0.001,  # 能量门限的下限
+    "max_energy": 0.1,  # 能量门限的上限
+    "min_zcr": 0.05,  # 零交叉率门限的下限
+    "max_zcr": 0.5,  # 零交叉率门限的上限
+}
+
 # 幻觉内容检测模式
 HALLUCINATION_PATTERNS = [
     r"优优独播剧场",
@@ -51,6 +133,74 @@ HALLUCINATION_PATTERNS = [
     r"关注.*频道"
 ]
 
+# log-mel 特征缓存配置：同一推理窗口被多次解码时共用一次特征计算
+FEATURE_CACHE_CONFIG = {
+    # 只在可能复用时默认开启：自动语言检测，或重解码模型与默认模型的 mel 维度相同；
+    # 关闭时模型使用 faster-whisper 原本的特征提取
+    "enabled": DEFAULT_LANGUAGE == AUTO_LANGUAGE or (
+        ESCALATION_CONFIG["enabled"]
+        and MODEL_MEL_BINS.get(ESCALATION_CONFIG["model"]) == MODEL_MEL_BINS.get(DEFAULT_MODEL)
+    ),
+    "seconds": 60,  # 缓存的音频时长，需覆盖重解码队列的积压
+}
+
+# 持久化配置：会话、分段和参数保存在本地 SQLite（WAL 模式）
+STORAGE_CONFIG = {
+    "enabled": True,
+    "path": "data/whisprrt.db",
+    "batch_size": 200,  # 写线程每个事务最多提交的写操作数
+    "flush_interval": 0.5,  # 攒批的最长等待时间（秒）
+}
+
+# 音频归档配置：采集的原始音频以 int16 写入固定大小的分片文件，支持按时间范围重新转写
+ARCHIVE_CONFIG = {
+    "enabled": False,
+    "path": "data/audio",
+    "segment_seconds": 60,  # 每个分片文件的时长
+    "max_bytes": 2 * 1024 ** 3,  # 所有归档的总大小上限，超出删除最旧的分片
+    "max_age_hours": 72,  # 分片最长保留时间
+    "max_retranscribe_seconds": 1800,  # 单次重新转写的最大时长
+}
+
+# 转写结果缓存配置：按音频内容、模型和解码参数的哈希缓存结果
+RESULT_CACHE_CONFIG = {
+    "enabled": True,
+    "memory_entries": 256,  # 内存 LRU 的条目上限
+    "disk_enabled": True,  # 是否启用磁盘层
+    "disk_path": "data/cache",
+    "disk_max_bytes": 256 * 1024 ** 2,  # 磁盘层总大小上限，超出按最久未使用淘汰
+}
+
+# WebSocket 推送配置
+WEBSOCKET_CONFIG = {
+    "default_protocol": "json",  # 网页使用的原始 JSON 格式
+    "protocols": ["json", "compact", "binary"],
+    "default_flush_ms": {"json": 0, "compact": 100, "binary": 100},  # 合并推送的间隔
+    "max_flush_ms": 2000,
+    "max_pending": 1000,  # 单个连接积压的事件上限，超出丢弃最旧的
+}
+
+# 多进程部署配置：前端进程按会话把 HTTP 和 WebSocket 请求转发到所属的工作进程
+CLUSTER_CONFIG = {
+    "socket_dir": "run",  # 工作进程监听的 Unix 套接字目录
+    "session_param": "session",  # 查询参数中的会话键
+    "session_header": "x-whisprrt-session",  # 请求头中的会话键
+    "session_cookie": "whisprrt_session",  # 未指定会话键时由前端进程分配并写入的 Cookie
+    "session_ttl_hours": 24,  # 会话键超过该时长未访问即从亲和表中移除
+    "connect_timeout": 10,  # 连接工作进程的超时时间（秒）
+    "restart_delay": 2,  # 工作进程异常退出后重启前的等待时间（秒）
+}
+
+# 静态资源配置：python -m app.assets 生成带哈希和预压缩的资源
+ASSET_CONFIG = {
+    "source_dir": "static",
+    "output_dir": "dist",
+    "url_prefix": "/assets",
+    "hash_length": 10,  # 文件名中内容哈希的长度
+    "compress_types": [".css", ".js", ".svg", ".html", ".json", ".txt"],  # 生成预压缩版本的文件类型
+    "max_age": 365 * 24 * 3600,  # 带哈希资源的缓存时间（秒）
+}
+
 # 服务器配置
 HOST = "0.0.0.0"
 PORT = 5444
\ No newline at end of file
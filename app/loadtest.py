@@ -0,0 +1,410 @@
+"""
+本地压测工具
+
+用法: python -m app.loadtest --subscribers 200 --streams 1 --audio sample.wav --duration 60
+
+对运行中的服务打开 N 个 /ws 订阅连接和 M 个 /ws/audio 音频流会话，按实时速度回放音频，
+同时定期通过 /websocket_probe 广播探测事件，统计：
+
+- 推送延迟：探测事件从发出到各订阅者收到的耗时（同一台机器上的时钟，无需对时）
+- 丢失消息：订阅者收到的事件序号出现的缺口，以及服务端统计的丢弃数
+- 服务进程的 CPU 占用和常驻内存（/process_status）
+
+多进程模式下每个音频流使用独立的会话键，由前端进程路由到不同的工作进程，
+订阅者按轮转方式订阅这些会话。
+"""
+import json
+import time
+import wave
+import asyncio
+import argparse
+import urllib.request
+import numpy as np
+from websockets.asyncio.client import connect
+from app.services import protocol
+from app.config import SAMPLE_RATE, CLUSTER_CONFIG
+
+def load_audio(path, seconds):
+    """
+    读取回放用的音频，转换为 16kHz 单声道 int16
+
+    Args:
+        path: 16 位 PCM WAV 文件路径，为空时生成合成信号
+        seconds: 合成信号的时长
+
+    Returns:
+        numpy.ndarray: int16 音频
+    """
+    if not path:
+        # 合成的调幅噪声，只用于压测采集和推送路径，通常不会产生转写结果
+        t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 0.5 * t)
+        noise = np.random.default_rng(0).standard_normal(len(t))
+        return (np.clip(noise * envelope * 0.1, -1.0, 1.0) * 32767).astype(np.int16)
+
+    with wave.open(path, "rb") as f:
+        if f.getsampwidth() != 2:
+            raise ValueError("只支持 16 位 PCM WAV 文件")
+        channels = f.getnchannels()
+        rate = f.getframerate()
+        pcm = np.frombuffer(f.readframes(f.getnframes()), dtype="<i2")
+    audio = pcm.reshape(-1, channels).mean(axis=1)
+    if rate != SAMPLE_RATE:
+        positions = np.arange(0, len(audio), rate / SAMPLE_RATE)
+        audio = np.interp(positions, np.arange(len(audio)), audio)
+    return audio.astype(np.int16)
+
+def percentile(values, q):
+    """
+    计算分位数
+
+    Args:
+        values: 数值列表
+        q: 分位（0-100）
+
+    Returns:
+        float: 分位数，空列表时为 None
+    """
+    return float(np.percentile(values, q)) if values else None
+
+class LoadTest:
+    """压测过程及统计"""
+
+    def __init__(self, args):
+        """
+        初始化压测
+
+        Args:
+            args: 命令行参数
+        """
+        self.args = args
+        self.http_url = args.url.rstrip("/")
+        self.ws_url = "ws" + self.http_url[len("http"):]
+        self.session_keys = [f"loadtest-{index}" for index in range(max(args.streams, 1))]
+        self.audio = load_audio(args.audio, args.duration)
+        self.probes = {}  # 探测编号 -> 会话键
+        self.latencies = []
+        self.received_probes = 0
+        self.gaps = 0
+        self.events = 0
+        self.transcriptions = 0
+        self.connected = 0
+        self.failed = 0
+        self.streamed_seconds = 0.0
+        self.stream_errors = []
+
+    def session_url(self, path, key, **params):
+        """
+        拼接带会话键的地址
+
+        Args:
+            path: 路径
+            key: 会话键
+            **params: 其他查询参数
+
+        Returns:
+            str: 地址
+        """
+        base = self.ws_url if path.startswith("/ws") else self.http_url
+        query = "&".join(f"{name}={value}" for name, value in {CLUSTER_CONFIG["session_param"]: key, **params}.items())
+        return f"{base}{path}?{query}"
+
+    def http(self, method, url, body=None):
+        """
+        发送 HTTP 请求（在线程池中调用）
+
+        Args:
+            method: 请求方法
+            url: 地址
+            body: JSON 请求体
+
+        Returns:
+            dict: JSON 响应
+        """
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(url, data=data, method=method, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return json.loads(response.read())
+
+    def decode(self, message):
+        """
+        按协商的协议解码一帧
+
+        Args:
+            message: 文本或二进制帧
+
+        Returns:
+            list: [(seq, event_type, data)]
+        """
+        if self.args.protocol == "binary":
+            return protocol.decode_binary(message)
+        payload = json.loads(message)
+        if self.args.protocol == "compact":
+            return [(row[0], row[1], row[2] if len(row) == 3 else None) for row in payload]
+        return [(payload["seq"], payload["event"], payload["data"])]
+
+    async def subscriber(self, index, deadline):
+        """
+        一个订阅连接：记录探测延迟和序号缺口
+
+        Args:
+            index: 订阅者序号
+            deadline: 结束时间
+        """
+        key = self.session_keys[index % len(self.session_keys)]
+        url = self.session_url("/ws", key, protocol=self.args.protocol)
+        try:
+            websocket = await connect(url, max_size=None, open_timeout=30)
+        except Exception:
+            self.failed += 1
+            return
+        self.connected += 1
+        last_seq = None
+        try:
+            while time.time() < deadline:
+                try:
+                    message = await asyncio.wait_for(websocket.recv(), timeout=max(deadline - time.time(), 0.01))
+                except asyncio.TimeoutError:
+                    break
+                received_at = time.time()
+                for seq, event_type, data in self.decode(message):
+                    if last_seq is not None and seq > last_seq + 1:
+                        self.gaps += seq - last_seq - 1
+                    last_seq = max(seq, last_seq or 0)
+                    self.events += 1
+                    if event_type == "probe":
+                        self.received_probes += 1
+                        self.latencies.append((received_at - data["sent_at"]) * 1000)
+                    elif event_type in ("transcription", "t"):
+                        self.transcriptions += 1
+        except Exception:
+            pass
+        finally:
+            await websocket.close()
+
+    async def stream(self, key, deadline):
+        """
+        一个音频流会话：按实时速度循环回放音频
+
+        Args:
+            key: 会话键
+            deadline: 结束时间
+        """
+        chunk = int(SAMPLE_RATE * self.args.chunk_ms / 1000)
+        interval = self.args.chunk_ms / 1000 / self.args.speed
+        try:
+            async with connect(self.session_url("/ws/audio", key, format="s16"), open_timeout=30) as websocket:
+                status = json.loads(await websocket.recv())
+                if status["event"] == "error":
+                    self.stream_errors.append(f"{key}: {status['data']['message']}")
+                    return
+                position = 0
+                next_send = time.perf_counter()
+                while time.time() < deadline:
+                    block = self.audio[position:position + chunk]
+                    if len(block) < chunk:
+                        block = np.concatenate([block, self.audio[:chunk - len(block)]])
+                    position = (position + chunk) % len(self.audio)
+                    await websocket.send(block.tobytes())
+                    self.streamed_seconds += chunk / SAMPLE_RATE
+                    next_send += interval
+                    await asyncio.sleep(max(next_send - time.perf_counter(), 0))
+        except Exception as e:
+            self.stream_errors.append(f"{key}: {str(e)}")
+
+    async def prober(self, deadline):
+        """
+        定期向每个会话所在的进程广播探测事件
+
+        Args:
+            deadline: 结束时间
+        """
+        probe_id = 0
+        while time.time() < deadline - 1:
+            for key in self.session_keys:
+                probe_id += 1
+                self.probes[probe_id] = key
+                try:
+                    await asyncio.to_thread(
+                        self.http, "POST", self.session_url("/websocket_probe", key),
+                        {"id": probe_id, "sent_at": time.time()}
+                    )
+                except Exception:
+                    del self.probes[probe_id]
+            await asyncio.sleep(self.args.probe_interval)
+
+    async def sample_processes(self):
+        """
+        采集各会话所在服务进程的资源占用
+
+        Returns:
+            dict: 进程号 -> (采集时间, 进程状态)
+        """
+        samples = {}
+        for key in self.session_keys:
+            try:
+                status = await asyncio.to_thread(self.http, "GET", self.session_url("/process_status", key))
+                samples[status["pid"]] = (time.time(), status)
+            except Exception:
+                pass
+        return samples
+
+    async def server_dropped(self):
+        """
+        汇总服务端统计的丢弃事件数
+
+        Returns:
+            int: 丢弃数
+        """
+        dropped = {}
+        for key in self.session_keys:
+            try:
+                process = await asyncio.to_thread(self.http, "GET", self.session_url("/process_status", key))
+                status = await asyncio.to_thread(self.http, "GET", self.session_url("/websocket_status", key))
+                dropped[process["pid"]] = status["websocket"]["dropped"]
+            except Exception:
+                pass
+        return sum(dropped.values())
+
+    async def run(self):
+        """
+        执行压测
+
+        Returns:
+            dict: 压测报告
+        """
+        before = await self.sample_processes()
+        started = time.time()
+        deadline = started + self.args.duration
+
+        # 先建立订阅连接，再开始推流和探测
+        subscribers = [asyncio.create_task(self.subscriber(i, deadline)) for i in range(self.args.subscribers)]
+        await asyncio.sleep(min(2, self.args.duration / 10))
+        streams = [asyncio.create_task(self.stream(key, deadline)) for key in self.session_keys[:self.args.streams]]
+        dropped = await self.server_dropped()
+        await asyncio.gather(self.prober(deadline), *streams)
+        server_dropped = await self.server_dropped() - dropped
+        await asyncio.gather(*subscribers)
+
+        after = await self.sample_processes()
+        return self.report(before, after, time.time() - started, server_dropped)
+
+    def report(self, before, after, elapsed, server_dropped):
+        """
+        生成压测报告
+
+        Args:
+            before: 开始时的进程状态
+            after: 结束时的进程状态
+            elapsed: 总耗时（秒）
+            server_dropped: 压测期间服务端丢弃的事件数
+
+        Returns:
+            dict: 报告
+        """
+        processes = []
+        for pid, (end_time, end) in after.items():
+            if pid not in before:
+                continue
+            start_time, start = before[pid]
+            wall = end_time - start_time
+            # 不支持的平台上服务端不返回内存数据
+            has_rss = start["rss_bytes"] is not None and end["rss_bytes"] is not None
+            processes.append({
+                "pid": pid,
+                "cpu_percent": round((end["cpu_seconds"] - start["cpu_seconds"]) / wall * 100, 1) if wall else None,
+                "rss_mb": round(end["rss_bytes"] / 1024 ** 2, 1) if has_rss else None,
+                "rss_delta_mb": round((end["rss_bytes"] - start["rss_bytes"]) / 1024 ** 2, 1) if has_rss else None,
+                "threads": end["threads"]
+            })
+
+        # 每个探测事件应送达订阅了对应会话的所有连接
+        per_key = {key: 0 for key in self.session_keys}
+        for index in range(self.connected):
+            per_key[self.session_keys[index % len(self.session_keys)]] += 1
+        expected = sum(per_key[key] for key in self.probes.values())
+        return {
+            "duration_seconds": round(elapsed, 1),
+            "subscribers": {"requested": self.args.subscribers, "connected": self.connected, "failed": self.failed},
+            "streams": {
+                "requested": self.args.streams,
+                "streamed_seconds": round(self.streamed_seconds, 1),
+                "errors": self.stream_errors
+            },
+            "fanout_latency_ms": {
+                "samples": len(self.latencies),
+                "p50": percentile(self.latencies, 50),
+                "p95": percentile(self.latencies, 95),
+                "p99": percentile(self.latencies, 99),
+                "max": max(self.latencies) if self.latencies else None
+            },
+            "messages": {
+                "events": self.events,
+                "transcriptions": self.transcriptions,
+                "probes_sent": len(self.probes),
+                "probes_expected": expected,
+                "probes_received": self.received_probes,
+                "seq_gaps": self.gaps,
+                "server_dropped": server_dropped
+            },
+            "processes": processes
+        }
+
+def print_report(report):
+    """
+    打印可读的压测报告
+
+    Args:
+        report: 压测报告
+    """
+    subscribers = report["subscribers"]
+    streams = report["streams"]
+    latency = report["fanout_latency_ms"]
+    messages = report["messages"]
+    print(f"耗时: {report['duration_seconds']} 秒")
+    print(f"订阅连接: {subscribers['connected']}/{subscribers['requested']} (失败 {subscribers['failed']})")
+    print(f"音频流: {streams['requested']} 路，共回放 {streams['streamed_seconds']} 秒")
+    for error in streams["errors"]:
+        print(f"  音频流错误: {error}")
+    if latency["samples"]:
+        print(
+            f"推送延迟(ms): p50={latency['p50']:.1f} p95={latency['p95']:.1f} "
+            f"p99={latency['p99']:.1f} max={latency['max']:.1f} (样本 {latency['samples']})"
+        )
+    else:
+        print("推送延迟: 无样本")
+    print(
+        f"消息: 事件 {messages['events']}，转写 {messages['transcriptions']}，"
+        f"探测 {messages['probes_received']}/{messages['probes_expected']}，"
+        f"序号缺口 {messages['seq_gaps']}，服务端丢弃 {messages['server_dropped']}"
+    )
+    for process in report["processes"]:
+        memory = "不可用" if process["rss_mb"] is None \
+            else f"{process['rss_mb']} MB (变化 {process['rss_delta_mb']:+} MB)"
+        print(
+            f"进程 {process['pid']}: CPU {process['cpu_percent']}%，内存 {memory}，线程 {process['threads']}"
+        )
+
+def main():
+    """压测入口"""
+    parser = argparse.ArgumentParser(description="WhisprRT 本地压测工具")
+    parser.add_argument("--url", default="http://127.0.0.1:5444", help="服务地址")
+    parser.add_argument("--subscribers", type=int, default=100, help="/ws 订阅连接数")
+    parser.add_argument("--streams", type=int, default=1, help="音频流会话数，单进程模式只支持 1")
+    parser.add_argument("--audio", help="回放的 16 位 PCM WAV 文件，不指定时使用合成信号")
+    parser.add_argument("--duration", type=float, default=30, help="压测时长（秒）")
+    parser.add_argument("--protocol", choices=["json", "compact", "binary"], default="json")
+    parser.add_argument("--probe-interval", type=float, default=0.5, help="探测事件间隔（秒）")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="每帧音频时长（毫秒）")
+    parser.add_argument("--speed", type=float, default=1.0, help="回放速度倍数")
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出报告")
+    args = parser.parse_args()
+
+    report = asyncio.run(LoadTest(args).run())
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,17 @@
 """
 应用入口模块
 """
+import os
 import uvicorn
 from fastapi import FastAPI, Request
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from app.api.router import api_router
+from app.assets import AssetFiles, CachedPage
 from app.core.logging import logger
-from app.config import HOST, PORT
+from app.services.storage import transcript_store
+from app.config import HOST, PORT, ASSET_CONFIG
 
 # 创建FastAPI应用
 app = FastAPI(title="实时语音转写")
@@ -16,17 +19,28 @@ app = FastAPI(title="实时语音转写")
 # 挂载静态文件
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# 设置模板
+# 挂载构建后的带哈希资源（python -m app.assets）
+if os.path.isdir(ASSET_CONFIG["output_dir"]):
+    app.mount(ASSET_CONFIG["url_prefix"], AssetFiles(directory=ASSET_CONFIG["output_dir"]), name="assets")
+
+# 设置模板，主页内容固定，只渲染一次
 templates = Jinja2Templates(directory="templates")
+index_page = CachedPage(templates, "index.html")
 
 # 注册API路由
 app.include_router(api_router)
 
+# 关闭时写入剩余的持久化数据
+@app.on_event("shutdown")
+def shutdown():
+    """应用关闭时刷新持久化写队列"""
+    transcript_store.close()
+
 # 主页路由
 @app.get('/', response_class=HTMLResponse)
 async def index(request: Request):
     """
-    渲染主页
+    返回主页，模板只在首次请求时渲染
     
     Args:
         request: 请求对象
@@ -34,7 +48,7 @@ async def index(request: Request):
     Returns:
         HTML响应
     """
-    return templates.TemplateResponse("index.html", {"request": request})
+    return index_page.response(request)
 
 # 应用启动入口
 if __name__ == '__main__':
@@ -17,4 +17,21 @@ class TimestampRequest(BaseModel):
 
 class DeviceRequest(BaseModel):
     """音频设备选择请求"""
-    device_id: str
\ No newline at end of file
+    device_id: str
+
+class PreprocessModeRequest(BaseModel):
+    """预处理模式选择请求"""
+    mode: str
+
+class RetranscribeRequest(BaseModel):
+    """归档音频重新转写请求"""
+    start_ms: int
+    end_ms: int
+    model: str
+    language: str = None
+    beam_size: int = 5
+
+class ProbeRequest(BaseModel):
+    """推送延迟探测请求"""
+    id: int
+    sent_at: float
@@ -0,0 +1,240 @@
+"""
+音频归档服务
+"""
+import os
+import json
+import time
+import shutil
+import threading
+import numpy as np
+from app.core.logging import logger
+from app.config import SAMPLE_RATE, ARCHIVE_CONFIG
+
+class AudioArchive:
+    """
+    滚动音频归档
+
+    每个会话一个目录，采集到的音频按流内偏移写入固定大小的 int16 分片文件（内存映射），
+    空间只有 float32 的一半。读取时直接映射分片文件切片，不需要整段读入内存。
+    超过总大小或保留时长的最旧分片会被删除。
+    """
+
+    def __init__(self):
+        """初始化归档服务"""
+        self.config = ARCHIVE_CONFIG
+        self.root = self.config["path"]
+        self.segment_samples = int(self.config["segment_seconds"] * SAMPLE_RATE)
+        self.lock = threading.Lock()
+        self.session_id = None
+        self.offset = 0
+        self.current_index = None
+        self.current_map = None
+
+    @property
+    def enabled(self):
+        """是否启用归档"""
+        return self.config["enabled"]
+
+    def session_dir(self, session_id):
+        """
+        会话归档目录
+
+        Args:
+            session_id: 会话编号
+
+        Returns:
+            str: 目录路径
+        """
+        return os.path.join(self.root, os.path.basename(session_id))
+
+    def segment_path(self, session_id, index):
+        """
+        分片文件路径
+
+        Args:
+            session_id: 会话编号
+            index: 分片序号
+
+        Returns:
+            str: 文件路径
+        """
+        return os.path.join(self.session_dir(session_id), f"{index:06d}.pcm")
+
+    def open_session(self, session_id):
+        """
+        开始归档一个会话
+
+        Args:
+            session_id: 会话编号
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            self.close_locked()
+            os.makedirs(self.session_dir(session_id), exist_ok=True)
+            self.session_id = session_id
+            self.offset = 0
+        self.enforce_retention()
+        logger.info(f"开始归档会话音频: {session_id}")
+
+    def close_session(self):
+        """结束当前会话的归档"""
+        with self.lock:
+            self.close_locked()
+
+    def close_locked(self):
+        """落盘当前分片并写入会话元数据，调用方需持有锁"""
+        if self.current_map is not None:
+            self.current_map.flush()
+            self.current_map = None
+            self.current_index = None
+        if self.session_id is not None:
+            self.write_meta()
+            self.session_id = None
+
+    def write_meta(self):
+        """写入当前会话的已归档长度"""
+        meta = {"sample_rate": SAMPLE_RATE, "samples": self.offset, "segment_samples": self.segment_samples}
+        with open(os.path.join(self.session_dir(self.session_id), "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def open_segment(self, index):
+        """
+        打开（必要时创建）当前会话的一个分片用于写入
+
+        Args:
+            index: 分片序号
+        """
+        if self.current_map is not None:
+            self.current_map.flush()
+            self.write_meta()
+            self.enforce_retention()
+        path = self.segment_path(self.session_id, index)
+        mode = "r+" if os.path.exists(path) else "w+"
+        self.current_map = np.memmap(path, dtype=np.int16, mode=mode, shape=(self.segment_samples,))
+        self.current_index = index
+
+    def write(self, block):
+        """
+        追加一个采集到的音频块
+
+        Args:
+            block: 一维 float32 音频
+        """
+        if not self.enabled or self.session_id is None:
+            return
+        pcm = (np.clip(block, -1.0, 1.0) * 32767).astype(np.int16)
+        with self.lock:
+            if self.session_id is None:
+                return
+            written = 0
+            while written < len(pcm):
+                index, position = divmod(self.offset, self.segment_samples)
+                if index != self.current_index:
+                    self.open_segment(index)
+                count = min(len(pcm) - written, self.segment_samples - position)
+                self.current_map[position:position + count] = pcm[written:written + count]
+                written += count
+                self.offset += count
+
+    def session_length(self, session_id):
+        """
+        获取会话已归档的采样数
+
+        Args:
+            session_id: 会话编号
+
+        Returns:
+            int: 采样数，无归档时为 0
+        """
+        if session_id == self.session_id:
+            return self.offset
+        meta_path = os.path.join(self.session_dir(session_id), "meta.json")
+        if not os.path.exists(meta_path):
+            return 0
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)["samples"]
+
+    def read(self, session_id, start_ms, end_ms):
+        """
+        读取会话在指定时间范围内的音频
+
+        Args:
+            session_id: 会话编号
+            start_ms: 起始偏移（毫秒）
+            end_ms: 结束偏移（毫秒）
+
+        Returns:
+            numpy.ndarray: float32 音频；已被清理的分片以静音填充
+        """
+        length = self.session_length(session_id)
+        start = max(int(start_ms * SAMPLE_RATE / 1000), 0)
+        end = min(int(end_ms * SAMPLE_RATE / 1000), length)
+        if end <= start:
+            return np.empty(0, dtype=np.float32)
+
+        output = np.zeros(end - start, dtype=np.float32)
+        position = start
+        while position < end:
+            index, offset = divmod(position, self.segment_samples)
+            count = min(end - position, self.segment_samples - offset)
+            path = self.segment_path(session_id, index)
+            if os.path.exists(path):
+                segment = np.memmap(path, dtype=np.int16, mode="r", shape=(self.segment_samples,))
+                output[position - start:position - start + count] = segment[offset:offset + count] / 32768.0
+                del segment
+            position += count
+        return output
+
+    def enforce_retention(self):
+        """按保留时长和总大小删除最旧的分片"""
+        if not os.path.isdir(self.root):
+            return
+        files = []
+        for session_id in os.listdir(self.root):
+            directory = self.session_dir(session_id)
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                if name.endswith(".pcm"):
+                    path = os.path.join(directory, name)
+                    stat = os.stat(path)
+                    files.append((stat.st_mtime, stat.st_size, path))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        expire_before = time.time() - self.config["max_age_hours"] * 3600
+        active_dir = self.session_dir(self.session_id) if self.session_id else None
+        for mtime, size, path in files:
+            if mtime >= expire_before and total <= self.config["max_bytes"]:
+                break
+            if active_dir and os.path.dirname(path) == active_dir:
+                continue
+            os.remove(path)
+            total -= size
+            logger.info(f"清理过期音频归档: {path}")
+
+        # 删除已经没有分片的会话目录
+        for session_id in os.listdir(self.root):
+            directory = self.session_dir(session_id)
+            if directory != active_dir and os.path.isdir(directory) \
+                    and not any(name.endswith(".pcm") for name in os.listdir(directory)):
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def get_status(self):
+        """
+        获取归档状态
+
+        Returns:
+            dict: 状态信息
+        """
+        return {
+            "enabled": self.enabled,
+            "path": self.root,
+            "session_id": self.session_id,
+            "archived_seconds": self.offset / SAMPLE_RATE if self.session_id else 0,
+            "segment_seconds": self.config["segment_seconds"]
+        }
+
+# 创建全局音频归档服务实例
+audio_archive = AudioArchive()
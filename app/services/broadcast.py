@@ -0,0 +1,184 @@
+"""
+WebSocket 广播服务
+"""
+import uuid
+import asyncio
+import threading
+from app.core.logging import logger
+from app.config import WEBSOCKET_CONFIG
+from app.services import protocol
+
+class Subscriber:
+    """
+    单个 WebSocket 订阅者
+
+    事件先进入本连接的待发送列表，由独立的发送任务按协商的间隔合并成批发送，
+    慢连接只会积压自己的队列，不会拖慢其他连接和转写线程。
+    """
+
+    def __init__(self, websocket, protocol_name, flush_interval):
+        """
+        初始化订阅者
+
+        Args:
+            websocket: WebSocket 连接对象
+            protocol_name: 协议名称 (json / compact / binary)
+            flush_interval: 合并推送间隔（秒），0 表示立即发送
+        """
+        self.websocket = websocket
+        self.protocol = protocol_name
+        self.flush_interval = flush_interval
+        self.pending = []
+        # 续传快照已覆盖的序号，之前的实时事件不再重复发送；快照入队前为 -1，
+        # 新启动的服务序号为 0，连接状态消息也不能被过滤
+        self.floor_seq = -1
+        self.wakeup = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+
+    def enqueue(self, event):
+        """
+        加入一个待发送事件，必须在事件循环线程中调用
+
+        Args:
+            event: (seq, event_type, data)
+        """
+        if event[0] <= self.floor_seq:
+            return
+        self.pending.append(event)
+        overflow = len(self.pending) - WEBSOCKET_CONFIG["max_pending"]
+        if overflow > 0:
+            del self.pending[:overflow]
+            self.dropped += overflow
+        self.wakeup.set()
+
+    async def send(self, events):
+        """
+        按协议编码并发送一批事件
+
+        Args:
+            events: [(seq, event_type, data)]
+        """
+        if self.protocol == "compact":
+            await self.websocket.send_text(protocol.encode_compact(events))
+        elif self.protocol == "binary":
+            await self.websocket.send_bytes(protocol.encode_binary(events))
+        else:
+            for event in events:
+                await self.websocket.send_json(protocol.encode_json(event))
+        self.sent += len(events)
+
+    async def run(self):
+        """发送任务主循环"""
+        while True:
+            await self.wakeup.wait()
+            if self.flush_interval:
+                await asyncio.sleep(self.flush_interval)
+            self.wakeup.clear()
+            events, self.pending = self.pending, []
+            if not events:
+                continue
+            try:
+                await self.send(events)
+            except Exception as e:
+                logger.error(f"WebSocket发送消息失败: {str(e)}")
+                return
+
+class Broadcaster:
+    """
+    广播服务类
+
+    所有事件在这里分配单调递增的序号，再投递到每个订阅者的发送队列。
+    publish 可以在任意线程调用，投递通过 call_soon_threadsafe 切回服务器事件循环。
+    """
+
+    def __init__(self):
+        """初始化广播服务"""
+        self.subscribers = set()
+        self.loop = None
+        self.seq = 0
+        self.seq_lock = threading.Lock()
+        # 本次启动的标识，序号在重启后从 0 开始，客户端据此判断旧游标是否仍然有效
+        self.boot_id = uuid.uuid4().hex[:12]
+
+    def register(self, subscriber):
+        """
+        注册订阅者，必须在事件循环中调用
+
+        Args:
+            subscriber: 订阅者
+        """
+        self.loop = asyncio.get_running_loop()
+        self.subscribers.add(subscriber)
+
+    def unregister(self, subscriber):
+        """
+        注销订阅者
+
+        Args:
+            subscriber: 订阅者
+        """
+        self.subscribers.discard(subscriber)
+
+    def next_seq(self):
+        """
+        分配一个事件序号
+
+        Returns:
+            int: 序号
+        """
+        with self.seq_lock:
+            self.seq += 1
+            return self.seq
+
+    def dispatch(self, event):
+        """
+        在事件循环线程中把事件投递给所有订阅者
+
+        Args:
+            event: (seq, event_type, data)
+        """
+        for subscriber in list(self.subscribers):
+            subscriber.enqueue(event)
+
+    def publish(self, event_type, data):
+        """
+        发布事件，可在任意线程调用
+
+        Args:
+            event_type: 事件类型
+            data: 事件数据
+
+        Returns:
+            int: 事件序号
+        """
+        seq = self.next_seq()
+        if self.loop is not None and self.subscribers:
+            try:
+                self.loop.call_soon_threadsafe(self.dispatch, (seq, event_type, data))
+            except RuntimeError:
+                # 事件循环已关闭
+                pass
+        return seq
+
+    def get_status(self):
+        """
+        获取广播状态
+
+        Returns:
+            dict: 状态信息
+        """
+        return {
+            "boot": self.boot_id,
+            "seq": self.seq,
+            "subscribers": len(self.subscribers),
+            "protocols": {
+                name: sum(1 for s in self.subscribers if s.protocol == name)
+                for name in WEBSOCKET_CONFIG["protocols"]
+            },
+            "pending": sum(len(s.pending) for s in self.subscribers),
+            "dropped": sum(s.dropped for s in self.subscribers)
+        }
+
+# 创建全局广播服务实例
+broadcaster = Broadcaster()
@@ -0,0 +1,216 @@
+"""
+转写结果缓存服务
+"""
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from app.core.logging import logger
+from app.config import RESULT_CACHE_CONFIG, ANTI_HALLUCINATION_CONFIG, VAD_CONFIG
+
+# 影响解码结果的参数，参与缓存键计算
+DECODE_PARAMS = (
+    "temperature", "no_speech_threshold", "condition_on_previous_text",
+    "compression_ratio_threshold", "log_prob_threshold", "initial_prompt"
+)
+
+class ResultCache:
+    """
+    内容寻址的转写结果缓存
+
+    缓存键为音频内容哈希加上模型名、语言和解码参数，内容相同的音频以相同参数
+    再次转写时直接返回结果。内存层为 LRU，磁盘层按总大小淘汰最久未使用的条目。
+    """
+
+    def __init__(self):
+        """初始化缓存"""
+        self.config = RESULT_CACHE_CONFIG
+        self.memory = OrderedDict()
+        self.lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self.disk_bytes = None
+
+    def make_key(self, audio, model_name, language, **params):
+        """
+        计算缓存键
+
+        Args:
+            audio: float32 音频
+            model_name: 模型名称
+            language: 语言代码
+            **params: 其他影响结果的解码参数（如 beam_size）
+
+        Returns:
+            str: 十六进制键
+        """
+        decode = {name: ANTI_HALLUCINATION_CONFIG[name] for name in DECODE_PARAMS}
+        decode["vad"] = [VAD_CONFIG["min_silence_duration_ms"], VAD_CONFIG["speech_pad_ms"]]
+        decode.update(params)
+        digest = hashlib.blake2b(audio.tobytes(), digest_size=20)
+        digest.update(json.dumps([model_name, language, decode], sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        return digest.hexdigest()
+
+    def disk_path(self, key):
+        """
+        磁盘层条目路径
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            str: 文件路径
+        """
+        return os.path.join(self.config["disk_path"], key[:2], f"{key}.json")
+
+    def get(self, key):
+        """
+        查询缓存
+
+        Args:
+            key: 缓存键
+
+        Returns:
+            任意: 缓存的结果，未命中时为 None
+        """
+        if not self.config["enabled"]:
+            return None
+        with self.lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self.memory[key]
+
+        if self.config["disk_enabled"]:
+            path = self.disk_path(key)
+            try:
+                with open(path, encoding="utf-8") as f:
+                    value = json.load(f)
+                os.utime(path)  # 记录最近使用时间，供淘汰使用
+                with self.lock:
+                    self.stats["disk_hits"] += 1
+                    self.put_memory(key, value)
+                return value
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"读取转写缓存失败: {str(e)}")
+
+        with self.lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key, value):
+        """
+        写入缓存
+
+        Args:
+            key: 缓存键
+            value: 可 JSON 序列化的结果
+        """
+        if not self.config["enabled"]:
+            return
+        with self.lock:
+            self.put_memory(key, value)
+        if self.config["disk_enabled"]:
+            try:
+                self.put_disk(key, value)
+            except Exception as e:
+                logger.warning(f"写入转写缓存失败: {str(e)}")
+
+    def put_memory(self, key, value):
+        """
+        写入内存层，调用方需持有锁
+
+        Args:
+            key: 缓存键
+            value: 结果
+        """
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.config["memory_entries"]:
+            self.memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def scan_disk(self):
+        """
+        列出磁盘层的所有条目
+
+        Returns:
+            list: [(最近使用时间, 大小, 路径)]
+        """
+        entries = []
+        root = self.config["disk_path"]
+        if not os.path.isdir(root):
+            return entries
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(".json"):
+                    path = os.path.join(directory, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def put_disk(self, key, value):
+        """
+        写入磁盘层，超出大小上限时淘汰最久未使用的条目
+
+        Args:
+            key: 缓存键
+            value: 结果
+        """
+        path = self.disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self.lock:
+            if self.disk_bytes is None:
+                self.disk_bytes = sum(size for _, size, _ in self.scan_disk())
+            else:
+                self.disk_bytes += len(data)
+            if self.disk_bytes <= self.config["disk_max_bytes"]:
+                return
+            entries = sorted(self.scan_disk())
+            self.disk_bytes = sum(size for _, size, _ in entries)
+            for _, size, old_path in entries:
+                if self.disk_bytes <= self.config["disk_max_bytes"]:
+                    break
+                os.remove(old_path)
+                self.disk_bytes -= size
+                self.stats["evictions"] += 1
+
+    def clear(self):
+        """清空内存层和磁盘层"""
+        with self.lock:
+            self.memory.clear()
+            for _, _, path in self.scan_disk():
+                os.remove(path)
+            self.disk_bytes = 0
+
+    def get_status(self):
+        """
+        获取缓存状态和命中率
+
+        Returns:
+            dict: 状态信息
+        """
+        with self.lock:
+            stats = dict(self.stats)
+            memory_entries = len(self.memory)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        return {
+            "enabled": self.config["enabled"],
+            "memory_entries": memory_entries,
+            "disk_enabled": self.config["disk_enabled"],
+            "disk_bytes": self.disk_bytes,
+            **stats,
+            "hit_rate": hits / lookups if lookups else 0.0
+        }
+
+# 创建全局结果缓存实例
+result_cache = ResultCache()
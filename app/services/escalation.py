@@ -0,0 +1,142 @@
+"""
+低置信度分段重解码服务
+"""
+import os
+import queue
+import threading
+import numpy as np
+from app.core.logging import logger
+from app.config import ESCALATION_CONFIG
+from app.services.whisper import whisper_service
+
+class EscalationService:
+    """
+    重解码服务类
+
+    实时路径使用小模型和 beam_size=1 快速出结果；置信度不足或被幻觉过滤器
+    标记的分段连同其音频进入本服务的队列，由低优先级后台线程使用更大的模型
+    和完整束搜索重新解码，改进后的结果通过回调交还给转写服务作为修正事件推送。
+    """
+
+    def __init__(self):
+        """初始化重解码服务"""
+        self.config = ESCALATION_CONFIG
+        self.q = queue.Queue(maxsize=self.config["max_pending"])
+        self.result_handler = None
+        self.worker = None
+        self.worker_lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+        self.processed = 0
+        self.failed = 0
+
+    def set_result_handler(self, handler):
+        """
+        设置重解码结果回调
+
+        Args:
+            handler: 回调函数，签名为 handler(job, text, confidence)
+        """
+        self.result_handler = handler
+
+    def submit(self, job):
+        """
+        提交一个待重解码的分段
+
+        Args:
+            job: 任务字典，至少包含 audio 和 language
+
+        Returns:
+            bool: 是否成功入队
+        """
+        if not self.config["enabled"]:
+            return False
+
+        self.ensure_worker()
+        try:
+            self.q.put_nowait(job)
+            self.submitted += 1
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("重解码队列已满，丢弃分段")
+            return False
+
+    def ensure_worker(self):
+        """确保后台重解码线程已启动"""
+        with self.worker_lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self.worker_loop, daemon=True)
+                self.worker.start()
+
+    def set_idle_priority(self):
+        """将当前线程降为最低调度优先级，避免抢占实时转写的CPU"""
+        try:
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except (AttributeError, OSError) as e:
+            logger.debug(f"无法降低重解码线程优先级: {str(e)}")
+
+    def decode(self, job):
+        """
+        使用大模型重解码一个分段
+
+        Args:
+            job: 任务字典
+
+        Returns:
+            tuple: (text, confidence) 合并后的文本和平均置信度
+        """
+        segments, _ = whisper_service.transcribe(
+            job["audio"],
+            job["language"],
+            model=whisper_service.get_model(self.config["model"]),
+            beam_size=self.config["beam_size"],
+            vad_filter=False,  # 分段音频已按语音区间截取
+            stream_offset=job.get("stream_offset")
+        )
+        segments_list = list(segments)
+        if not segments_list:
+            return "", 0.0
+
+        text = "".join(seg.text for seg in segments_list).strip()
+        confidence = float(np.mean([np.exp(seg.avg_logprob) for seg in segments_list]))
+        return text, confidence
+
+    def worker_loop(self):
+        """后台重解码主循环"""
+        self.set_idle_priority()
+        logger.info("重解码线程已启动")
+        while True:
+            job = self.q.get()
+            try:
+                text, confidence = self.decode(job)
+                self.processed += 1
+                logger.info(f"重解码完成: '{text}' (confidence: {confidence:.3f})")
+                if self.result_handler:
+                    self.result_handler(job, text, confidence)
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"重解码失败: {str(e)}")
+            finally:
+                self.q.task_done()
+
+    def get_status(self):
+        """
+        获取重解码服务状态
+
+        Returns:
+            dict: 状态信息
+        """
+        return {
+            "enabled": self.config["enabled"],
+            "model": self.config["model"],
+            "beam_size": self.config["beam_size"],
+            "pending": self.q.qsize(),
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "processed": self.processed,
+            "failed": self.failed
+        }
+
+# 创建全局重解码服务实例
+escalation_service = EscalationService()
@@ -0,0 +1,270 @@
+"""
+log-mel 特征缓存服务
+"""
+import threading
+from collections import deque
+import numpy as np
+from app.core.logging import logger
+from app.config import SAMPLE_RATE, FEATURE_CACHE_CONFIG
+
+# Whisper 特征提取的帧移（采样点）
+HOP_LENGTH = 160
+
+class FeatureCache:
+    """
+    按流内偏移缓存的 log-mel 特征
+
+    送入推理的窗口在预处理后计算一次 mel 帧（未归一化的 log10 能量），按窗口起点的
+    流内偏移存入环形缓冲。之后同一段音频的语言检测、转写和重解码只需从缓存取出帧，
+    再补算依赖边界填充的首尾几帧并做整窗归一化，结果与 faster-whisper 从原始音频计算的一致。
+    推理窗口互不重叠，只有同一窗口被多次解码时缓存才有收益（自动语言检测，或 mel 维度相同的
+    重解码模型），因此由调用方判断是否预先计算；saved_frames 统计扣除预先计算后实际省下的帧数。
+    """
+
+    def __init__(self):
+        """初始化特征缓存"""
+        self.config = FEATURE_CACHE_CONFIG
+        self.runs = deque()  # [{"origin", "frames", "lo", "audio"}]，按时间先后排列
+        self.cached_frames = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stats = {
+            "windows": 0, "fed_frames": 0, "computed_frames": 0, "reused_frames": 0,
+            "bypassed": 0, "bypassed_frames": 0
+        }
+
+    def reset(self):
+        """清空缓存（新会话开始时调用）"""
+        with self.lock:
+            self.runs.clear()
+            self.cached_frames = 0
+
+    @staticmethod
+    def compute(padded, indices, extractor):
+        """
+        计算指定帧的 log10 mel 能量，与 faster-whisper 的特征提取一致（不含归一化）
+
+        Args:
+            padded: 两端已按 n_fft // 2 反射填充的音频
+            indices: 帧序号数组
+            extractor: faster-whisper 的 FeatureExtractor，提供 n_fft 和 mel 滤波器
+
+        Returns:
+            numpy.ndarray: (n_mels, len(indices))
+        """
+        n_fft = extractor.n_fft
+        window = np.hanning(n_fft + 1)[:-1].astype(np.float32)
+        frames = np.lib.stride_tricks.sliding_window_view(padded, n_fft)[indices * HOP_LENGTH]
+        spectrum = np.fft.rfft(frames * window, axis=-1).astype(np.complex64)
+        magnitudes = np.abs(spectrum) ** 2
+        mel_spec = extractor.mel_filters @ magnitudes.T
+        return np.log10(np.clip(mel_spec, a_min=1e-10, a_max=None)).astype(np.float32)
+
+    def feed(self, audio, offset, extractor):
+        """
+        计算一个窗口的 mel 帧并存入缓存
+
+        只保存窗口内部的帧：首尾依赖反射或补零填充的帧在取用时按请求的音频重新计算。
+
+        Args:
+            audio: 一维 float32 音频（预处理后实际送入模型的数据）
+            offset: 音频起点在流中的偏移（采样点）
+            extractor: 当前模型的 FeatureExtractor
+        """
+        if not self.config["enabled"]:
+            return
+        half = extractor.n_fft // 2
+        lo = -(-half // HOP_LENGTH)  # 左侧不依赖填充的第一帧
+        hi = (len(audio) - half) // HOP_LENGTH + 1  # 右侧不依赖填充的帧数上限
+        if hi <= lo:
+            return
+        padded = np.pad(audio, half, mode="reflect")
+        frames = self.compute(padded, np.arange(lo, hi), extractor)
+
+        capacity = int(self.config["seconds"] * SAMPLE_RATE / HOP_LENGTH)
+        with self.lock:
+            self.runs.append({"origin": offset, "frames": frames, "lo": lo, "audio": audio})
+            self.cached_frames += frames.shape[1]
+            while self.cached_frames > capacity and len(self.runs) > 1:
+                self.cached_frames -= self.runs.popleft()["frames"].shape[1]
+            self.stats["windows"] += 1
+            self.stats["fed_frames"] += frames.shape[1]
+
+    def bind(self, audio, offset):
+        """
+        声明当前线程接下来解码的音频在流中的偏移，用于不与缓存窗口共享内存的音频副本
+
+        Args:
+            audio: 即将送入模型的音频
+            offset: 音频起点在流中的偏移，为 None 时不声明
+
+        Returns:
+            FeatureCache: 自身，作为上下文管理器使用
+        """
+        self.local.binding = (audio, offset) if offset is not None else None
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.local.binding = None
+
+    @staticmethod
+    def view_offset(waveform, base):
+        """
+        若 waveform 是 base 的连续切片，返回其在 base 中的起点
+
+        Args:
+            waveform: 待查询的音频
+            base: 缓存窗口的音频
+
+        Returns:
+            int: 起点（采样点），不是切片时为 None
+        """
+        if waveform is base:
+            return 0
+        if waveform.dtype != base.dtype or not waveform.flags.c_contiguous or not np.shares_memory(waveform, base):
+            return None
+        delta = waveform.ctypes.data - base.ctypes.data
+        if delta % base.itemsize:
+            return None
+        return delta // base.itemsize
+
+    def locate(self, waveform):
+        """
+        确定 waveform 在流中的偏移
+
+        Args:
+            waveform: 特征提取器收到的音频
+
+        Returns:
+            int: 流内偏移，无法确定时为 None
+        """
+        binding = getattr(self.local, "binding", None)
+        if binding is not None:
+            audio, offset = binding
+            start = self.view_offset(waveform, audio)
+            if start is not None:
+                return offset + start
+        for run in reversed(self.runs):
+            start = self.view_offset(waveform, run["audio"])
+            if start is not None:
+                return run["origin"] + start
+        return None
+
+    def extract(self, waveform, padding, extractor):
+        """
+        使用缓存生成与 FeatureExtractor.__call__ 相同的特征
+
+        Args:
+            waveform: 一维 float32 音频
+            padding: 末尾补零的采样点数
+            extractor: 模型的 FeatureExtractor
+
+        Returns:
+            numpy.ndarray: 归一化后的 log-mel 特征，没有可用缓存时为 None
+        """
+        if not self.config["enabled"] or waveform.dtype != np.float32 or waveform.ndim != 1:
+            return None
+        n_mels = extractor.mel_filters.shape[0]
+        with self.lock:
+            offset = self.locate(waveform)
+            run = None
+            if offset is not None:
+                for candidate in reversed(self.runs):
+                    shift = offset - candidate["origin"]
+                    if shift >= 0 and shift % HOP_LENGTH == 0 and candidate["frames"].shape[0] == n_mels \
+                            and offset < candidate["origin"] + len(candidate["audio"]):
+                        run = candidate
+                        break
+            if run is None:
+                self.stats["bypassed"] += 1
+                self.stats["bypassed_frames"] += (len(waveform) + padding) // HOP_LENGTH
+                return None
+
+            half = extractor.n_fft // 2
+            samples = np.pad(waveform, (0, padding)) if padding else waveform
+            total = len(samples) // HOP_LENGTH
+            features = np.empty((n_mels, total), dtype=np.float32)
+            missing = np.ones(total, dtype=bool)
+
+            # 本次请求内部（不依赖填充）且在缓存窗口内部的帧直接复用
+            base = (offset - run["origin"]) // HOP_LENGTH
+            first = max(-(-half // HOP_LENGTH), run["lo"] - base)
+            last = min(
+                (len(waveform) - half) // HOP_LENGTH + 1,
+                run["lo"] + run["frames"].shape[1] - base,
+                total
+            )
+            if last > first:
+                start = base + first - run["lo"]
+                features[:, first:last] = run["frames"][:, start:start + last - first]
+                missing[first:last] = False
+                self.stats["reused_frames"] += last - first
+
+        indices = np.flatnonzero(missing)
+        if len(indices):
+            padded = np.pad(samples, half, mode="reflect")
+            features[:, indices] = self.compute(padded, indices, extractor)
+            with self.lock:
+                self.stats["computed_frames"] += len(indices)
+
+        features = np.maximum(features, features.max() - 8.0)
+        return (features + 4.0) / 4.0
+
+    def get_status(self):
+        """
+        获取缓存状态
+
+        Returns:
+            dict: 状态信息
+        """
+        with self.lock:
+            stats = dict(self.stats)
+            cached_seconds = self.cached_frames * HOP_LENGTH / SAMPLE_RATE
+        # 解码时请求的帧中来自缓存的比例；预先计算的帧不算复用
+        served = stats["reused_frames"] + stats["computed_frames"] + stats["bypassed_frames"]
+        return {
+            "enabled": self.config["enabled"],
+            "cached_seconds": cached_seconds,
+            **stats,
+            "saved_frames": stats["reused_frames"] - stats["fed_frames"],
+            "reuse_rate": stats["reused_frames"] / served if served else 0.0
+        }
+
+class CachedFeatureExtractor:
+    """
+    包装模型的 FeatureExtractor：能从缓存取得特征时直接返回，否则交给原提取器计算
+    """
+
+    def __init__(self, extractor, cache):
+        """
+        初始化包装
+
+        Args:
+            extractor: faster-whisper 的 FeatureExtractor
+            cache: 特征缓存
+        """
+        self.extractor = extractor
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.extractor, name)
+
+    def __call__(self, waveform, padding=160, chunk_length=None):
+        """与 FeatureExtractor.__call__ 相同的接口"""
+        if chunk_length is not None:
+            self.extractor.n_samples = chunk_length * self.extractor.sampling_rate
+            self.extractor.nb_max_frames = self.extractor.n_samples // self.extractor.hop_length
+        try:
+            features = self.cache.extract(waveform, padding, self.extractor)
+        except Exception as e:
+            logger.warning(f"读取特征缓存失败: {str(e)}")
+            features = None
+        if features is None:
+            return self.extractor(waveform, padding=padding, chunk_length=chunk_length)
+        return features
+
+# 创建全局特征缓存实例
+feature_cache = FeatureCache()
@@ -0,0 +1,138 @@
+"""
+自适应静音门限服务
+"""
+import numpy as np
+from app.config import SAMPLE_RATE, ADAPTIVE_GATING_CONFIG
+
+class AdaptiveThresholds:
+    """
+    自适应噪声底估计器
+
+    VAD 判定不含语音的窗口整体就是环境噪声，用它的平均幅度和零交叉率作为观测，
+    与 is_silence 对整窗计算的统计量口径一致；尚未遇到这样的窗口时，退而使用
+    含语音窗口中能量最低的一部分短帧估计。两种观测都以非对称速度（上升慢、下降快）
+    跟踪，再按配置的系数换算出 silence/energy/zcr 三个门限。
+    所有观测都应使用归一化之前的信号，否则逐窗口变化的增益会让门限失去意义。
+    嘈杂环境下门限随噪声抬高，安静环境下随之放宽，送去推理的窗口数量跟随实际语音。
+    """
+
+    def __init__(self):
+        """初始化估计器"""
+        self.config = ADAPTIVE_GATING_CONFIG
+        self.frame_samples = int(self.config["frame_ms"] * SAMPLE_RATE / 1000)
+        self.reset()
+
+    def reset(self):
+        """清空估计，在新会话开始时调用"""
+        self.noise_energy = None
+        self.noise_zcr = None
+        self.frame_energy = None  # 短帧估计，没有纯噪声窗口时使用
+        self.frame_zcr = None
+        self.noise_windows = 0
+        self.windows = 0
+
+    @property
+    def ready(self):
+        """是否已有足够观测，可以替代静态门限"""
+        return self.config["enabled"] and self.windows >= self.config["warmup_windows"]
+
+    def track(self, current, observed):
+        """
+        按非对称速度跟随观测值
+
+        Args:
+            current: 当前估计
+            observed: 新观测
+
+        Returns:
+            float: 更新后的估计
+        """
+        if current is None:
+            return observed
+        rate = self.config["rise_rate"] if observed > current else self.config["fall_rate"]
+        return current + rate * (observed - current)
+
+    def observe(self, audio_data, speech=True):
+        """
+        用一个窗口的音频更新噪声底
+
+        Args:
+            audio_data: 一维音频（归一化之前），与 is_silence 使用的相同
+            speech: VAD 是否在该窗口检测到语音
+        """
+        if len(audio_data) < 2:
+            return
+
+        if not speech:
+            zcr = float(np.sum(np.abs(np.diff(audio_data > 0))) / (len(audio_data) - 1))
+            self.noise_energy = self.track(self.noise_energy, float(np.mean(np.abs(audio_data))))
+            self.noise_zcr = self.track(self.noise_zcr, zcr)
+            self.noise_windows += 1
+            self.windows += 1
+            return
+
+        n_frames = len(audio_data) // self.frame_samples
+        if n_frames == 0:
+            return
+        frames = audio_data[:n_frames * self.frame_samples].reshape(n_frames, self.frame_samples)
+        energies = np.mean(np.abs(frames), axis=1)
+        quiet = energies <= np.percentile(energies, self.config["floor_percentile"])
+
+        crossings = np.sum(np.abs(np.diff(frames[quiet] > 0, axis=1)), axis=1)
+        zcr = float(np.mean(crossings) / max(self.frame_samples - 1, 1))
+
+        self.frame_energy = self.track(self.frame_energy, float(np.mean(energies[quiet])))
+        self.frame_zcr = self.track(self.frame_zcr, zcr)
+        self.windows += 1
+
+    def floor(self):
+        """
+        当前使用的噪声底
+
+        Returns:
+            tuple: (energy, zcr)，优先使用纯噪声窗口的估计
+        """
+        if self.noise_energy is not None:
+            return self.noise_energy, self.noise_zcr
+        return self.frame_energy, self.frame_zcr
+
+    def thresholds(self):
+        """
+        根据当前噪声底计算门限
+
+        Returns:
+            dict: silence_threshold、energy_threshold 和 zcr_threshold
+        """
+        config = self.config
+        energy, zcr = self.floor()
+        return {
+            "silence_threshold": float(np.clip(
+                energy * config["silence_margin"], config["min_energy"], config["max_energy"]
+            )),
+            "energy_threshold": float(np.clip(
+                energy * config["energy_margin"], config["min_energy"], config["max_energy"]
+            )),
+            "zcr_threshold": float(np.clip(
+                zcr * config["zcr_margin"], config["min_zcr"], config["max_zcr"]
+            ))
+        }
+
+    def get_status(self):
+        """
+        获取估计器状态
+
+        Returns:
+            dict: 状态信息
+        """
+        energy, zcr = self.floor()
+        status = {
+            "enabled": self.config["enabled"],
+            "ready": self.ready,
+            "windows": self.windows,
+            "noise_windows": self.noise_windows,
+            "noise_energy": energy,
+            "noise_zcr": zcr
+        }
+        if energy is not None:
+            status["thresholds"] = self.thresholds()
+        return status
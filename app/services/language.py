@@ -0,0 +1,103 @@
+"""
+会话级语言检测服务
+"""
+import time
+from app.core.logging import logger
+from app.config import LANGUAGE_DETECTION_CONFIG
+from app.services.whisper import whisper_service
+
+class LanguageDetector:
+    """
+    会话级语言检测器
+
+    直接把 language=None 交给 faster-whisper 会在每个窗口上都跑一次语言检测。
+    这里只在首个有语音的窗口检测一次并缓存，之后仅在定期复检或分段置信度
+    连续偏低时才重新检测，检测到语言切换时返回事件数据供调用方广播。
+    """
+
+    def __init__(self):
+        """初始化语言检测器"""
+        self.config = LANGUAGE_DETECTION_CONFIG
+        self.reset()
+
+    def reset(self):
+        """重置缓存，在新会话开始时调用"""
+        self.language = None
+        self.probability = 0.0
+        self.last_check = 0.0
+        self.low_confidence_windows = 0
+        self.detections = 0
+
+    def needs_check(self):
+        """
+        判断当前窗口是否需要运行语言检测
+
+        Returns:
+            bool: 是否需要检测
+        """
+        if self.language is None:
+            return True
+        if self.low_confidence_windows >= self.config["low_confidence_windows"]:
+            return True
+        return time.time() - self.last_check >= self.config["recheck_seconds"]
+
+    def resolve(self, audio_samples):
+        """
+        返回当前窗口应使用的语言，必要时运行检测
+
+        Args:
+            audio_samples: 已判定为非静音的音频
+
+        Returns:
+            tuple: (language, event) 语言代码，以及发生切换时的事件数据（否则为 None）
+        """
+        if not self.needs_check():
+            return self.language, None
+
+        language, probability = whisper_service.detect_language(audio_samples)
+        self.detections += 1
+        self.last_check = time.time()
+        self.low_confidence_windows = 0
+        logger.debug(f"语言检测: {language} (probability: {probability:.3f})")
+
+        if self.language is None:
+            if probability < self.config["min_probability"]:
+                # 结果不够可靠，本窗口先用着但不缓存
+                return language, None
+        elif language == self.language or probability < self.config["switch_probability"]:
+            return self.language, None
+
+        previous = self.language
+        self.language = language
+        self.probability = probability
+        logger.info(f"检测到语言: {language} (probability: {probability:.3f})")
+        return language, {
+            "language": language,
+            "probability": probability,
+            "previous": previous
+        }
+
+    def report_confidence(self, confidence):
+        """
+        上报一个窗口的平均分段置信度，持续偏低时触发复检
+
+        Args:
+            confidence: 平均置信度
+        """
+        if confidence < self.config["low_confidence"]:
+            self.low_confidence_windows += 1
+        else:
+            self.low_confidence_windows = 0
+
+    def get_status(self):
+        """
+        获取检测器状态
+
+        Returns:
+            dict: 状态信息
+        """
+        return {
+            "language": self.language,
+            "probability": self.probability,
+            "detections": self.detections
+        }
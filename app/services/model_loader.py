@@ -0,0 +1,205 @@
+"""
+模型异步加载服务
+"""
+import time
+import threading
+from collections import OrderedDict
+from faster_whisper.utils import download_model
+from app.core.logging import logger
+from app.services.whisper import whisper_service
+from app.services.broadcast import broadcaster
+
+# 任务状态及对应进度
+JOB_PROGRESS = {
+    "pending": 0.0,
+    "downloading": 0.1,
+    "loading": 0.5,
+    "ready": 1.0,
+    "failed": 1.0,
+    "cancelled": 1.0
+}
+FINISHED_STATES = ("ready", "failed", "cancelled")
+
+class ModelLoader:
+    """
+    模型加载任务管理
+
+    切换模型时在后台线程中下载并加载新模型，加载期间旧模型继续服务，
+    加载完成后一次性替换。任务的每次状态变化都通过 WebSocket 推送 model_job 事件。
+    加载失败时保留当前模型，不再自动回退到默认模型。
+    同一时间只允许一个加载任务；取消在阶段之间生效，已加载的模型会被丢弃。
+    """
+
+    def __init__(self, max_history=20):
+        """
+        初始化加载服务
+
+        Args:
+            max_history: 保留的历史任务数
+        """
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.active = None
+        self.max_history = max_history
+
+    def submit(self, model_name):
+        """
+        提交一个模型加载任务
+
+        Args:
+            model_name: 模型名称
+
+        Returns:
+            dict: 任务信息，已有任务进行中时返回错误
+        """
+        with self.lock:
+            if self.active is not None:
+                return {"status": "error", "message": "已有模型加载任务进行中", "job": self.snapshot(self.active)}
+            job = {
+                "id": self.next_id,
+                "model": model_name,
+                "previous_model": whisper_service.model_name,
+                "state": "pending",
+                "progress": 0.0,
+                "message": "",
+                "created_at": time.time(),
+                "finished_at": None,
+                "cancel": threading.Event()
+            }
+            self.next_id += 1
+            self.jobs[job["id"]] = job
+            while len(self.jobs) > self.max_history:
+                self.jobs.popitem(last=False)
+            self.active = job
+
+        self.publish(job)
+        threading.Thread(target=self.run, args=(job,), daemon=True).start()
+        return {"status": "accepted", "message": f"正在加载模型: {model_name}", "job": self.snapshot(job)}
+
+    def run(self, job):
+        """
+        后台加载线程
+
+        Args:
+            job: 任务
+        """
+        model_name = job["model"]
+        try:
+            self.update(job, "downloading", "正在获取模型文件")
+            path = download_model(model_name)
+            if job["cancel"].is_set():
+                return self.finish(job, "cancelled", "任务已取消")
+
+            self.update(job, "loading", "正在加载模型")
+            model = whisper_service.create_model(path)
+            if job["cancel"].is_set():
+                del model
+                return self.finish(job, "cancelled", "任务已取消，已丢弃加载的模型")
+
+            whisper_service.install_model(model_name, model)
+            self.finish(job, "ready", f"已切换到模型: {model_name}")
+        except Exception as e:
+            logger.error(f"模型加载失败: {str(e)}")
+            self.finish(job, "failed", f"模型加载失败，继续使用 {whisper_service.model_name}: {str(e)}")
+
+    def update(self, job, state, message):
+        """
+        更新任务状态并推送
+
+        Args:
+            job: 任务
+            state: 新状态
+            message: 说明
+        """
+        with self.lock:
+            job["state"] = state
+            job["progress"] = JOB_PROGRESS[state]
+            job["message"] = message
+        logger.info(f"模型加载任务 {job['id']} ({job['model']}): {message}")
+        self.publish(job)
+
+    def finish(self, job, state, message):
+        """
+        结束任务
+
+        Args:
+            job: 任务
+            state: 结束状态
+            message: 说明
+        """
+        with self.lock:
+            job["finished_at"] = time.time()
+            if self.active is job:
+                self.active = None
+        self.update(job, state, message)
+
+    def cancel(self, job_id):
+        """
+        取消任务
+
+        Args:
+            job_id: 任务编号
+
+        Returns:
+            dict: 操作结果
+        """
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return {"status": "error", "message": f"任务不存在: {job_id}"}
+            if job["state"] in FINISHED_STATES:
+                return {"status": "error", "message": "任务已结束", "job": self.snapshot(job)}
+            job["cancel"].set()
+        return {"status": "success", "message": "已请求取消，当前阶段结束后生效", "job": self.snapshot(job)}
+
+    def publish(self, job):
+        """
+        推送任务状态
+
+        Args:
+            job: 任务
+        """
+        broadcaster.publish("model_job", self.snapshot(job))
+
+    def snapshot(self, job):
+        """
+        任务的可序列化副本
+
+        Args:
+            job: 任务
+
+        Returns:
+            dict: 任务信息
+        """
+        info = {key: value for key, value in job.items() if key != "cancel"}
+        info["cancel_requested"] = job["cancel"].is_set()
+        return info
+
+    def get_job(self, job_id):
+        """
+        查询任务
+
+        Args:
+            job_id: 任务编号
+
+        Returns:
+            dict: 任务信息，不存在时为 None
+        """
+        job = self.jobs.get(job_id)
+        return self.snapshot(job) if job else None
+
+    def get_status(self):
+        """
+        获取加载服务状态
+
+        Returns:
+            dict: 当前模型、进行中的任务和历史任务
+        """
+        with self.lock:
+            jobs = [self.snapshot(job) for job in reversed(self.jobs.values())]
+            active = self.snapshot(self.active) if self.active else None
+        return {"current": whisper_service.model_name, "active": active, "jobs": jobs}
+
+# 创建全局模型加载服务实例
+model_loader = ModelLoader()
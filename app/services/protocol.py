@@ -0,0 +1,136 @@
+"""
+WebSocket 推送协议编码
+"""
+import json
+import struct
+
+# 紧凑协议中转写类事件的类型代码
+COMPACT_TYPES = {"transcription": "t", "correction": "c"}
+BINARY_TYPES = {"transcription": 1, "correction": 2}
+BINARY_GENERIC = 0
+BINARY_VERSION = 1
+
+def segment_fields(data):
+    """
+    提取转写类事件的紧凑字段
+
+    Args:
+        data: 事件数据
+
+    Returns:
+        tuple: (id, start_ms, end_ms, confidence_permyriad, text)
+    """
+    return (
+        int(data.get("id", 0)),
+        int(data.get("start_ms", 0)),
+        int(data.get("end_ms", 0)),
+        int(round(float(data.get("confidence", 0.0)) * 10000)),
+        data.get("text", "")
+    )
+
+def encode_json(event):
+    """
+    原始 JSON 格式：每个事件一帧，字段与网页使用的一致
+
+    Args:
+        event: (seq, event_type, data)
+
+    Returns:
+        dict: 可直接 send_json 的消息
+    """
+    seq, event_type, data = event
+    return {"event": event_type, "seq": seq, "data": data}
+
+def encode_compact(events):
+    """
+    紧凑 JSON 格式：一批事件编码为一个数组帧
+
+    转写类事件为 [seq, "t"|"c", id, start_ms, end_ms, 置信度万分比, text]，
+    其他事件为 [seq, event_type, data]。
+
+    Args:
+        events: [(seq, event_type, data)]
+
+    Returns:
+        str: 文本帧
+    """
+    rows = []
+    for seq, event_type, data in events:
+        if event_type in COMPACT_TYPES:
+            rows.append([seq, COMPACT_TYPES[event_type], *segment_fields(data)])
+        else:
+            rows.append([seq, event_type, data])
+    return json.dumps(rows, ensure_ascii=False, separators=(",", ":"))
+
+def encode_binary(events):
+    """
+    二进制格式（小端）：一批事件编码为一个二进制帧
+
+    帧头为 u8 版本号 + u16 事件数；每个事件以 u8 类型 + u32 seq 开头。
+    转写类事件后接 u32 id、u32 start_ms、u32 end_ms、u16 置信度万分比、u16 文本长度和 UTF-8 文本；
+    其他事件后接 u16 事件名长度、事件名、u32 JSON 长度和 JSON 数据。
+
+    Args:
+        events: [(seq, event_type, data)]
+
+    Returns:
+        bytes: 二进制帧
+    """
+    parts = [struct.pack("<BH", BINARY_VERSION, len(events))]
+    for seq, event_type, data in events:
+        if event_type in BINARY_TYPES:
+            segment_id, start_ms, end_ms, confidence, text = segment_fields(data)
+            text_bytes = text.encode("utf-8")
+            parts.append(struct.pack(
+                "<BIIIIHH", BINARY_TYPES[event_type], seq, segment_id, start_ms, end_ms,
+                min(confidence, 0xFFFF), len(text_bytes)
+            ))
+            parts.append(text_bytes)
+        else:
+            name = event_type.encode("utf-8")
+            payload = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            parts.append(struct.pack("<BIH", BINARY_GENERIC, seq, len(name)))
+            parts.append(name)
+            parts.append(struct.pack("<I", len(payload)))
+            parts.append(payload)
+    return b"".join(parts)
+
+def decode_binary(frame):
+    """
+    解码二进制帧，供客户端和测试工具使用
+
+    Args:
+        frame: 二进制帧
+
+    Returns:
+        list: [(seq, event_type, data)]
+    """
+    names = {code: name for name, code in BINARY_TYPES.items()}
+    _, count = struct.unpack_from("<BH", frame, 0)
+    offset = 3
+    events = []
+    for _ in range(count):
+        code, seq = struct.unpack_from("<BI", frame, offset)
+        if code in names:
+            _, _, segment_id, start_ms, end_ms, confidence, length = struct.unpack_from("<BIIIIHH", frame, offset)
+            offset += struct.calcsize("<BIIIIHH")
+            text = frame[offset:offset + length].decode("utf-8")
+            offset += length
+            events.append((seq, names[code], {
+                "id": segment_id,
+                "start_ms": start_ms,
+                "end_ms": end_ms,
+                "confidence": confidence / 10000,
+                "text": text
+            }))
+        else:
+            _, _, name_length = struct.unpack_from("<BIH", frame, offset)
+            offset += struct.calcsize("<BIH")
+            name = frame[offset:offset + name_length].decode("utf-8")
+            offset += name_length
+            (payload_length,) = struct.unpack_from("<I", frame, offset)
+            offset += 4
+            data = json.loads(frame[offset:offset + payload_length].decode("utf-8"))
+            offset += payload_length
+            events.append((seq, name, data))
+    return events
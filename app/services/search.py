@@ -0,0 +1,171 @@
+"""
+转写全文检索服务
+"""
+import re
+import threading
+import unicodedata
+
+# 中日韩文字按字切分，其余按词切分；单词不能吞入相邻的中日韩文字
+CJK_RANGES = r"\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af"
+TOKEN_PATTERN = re.compile(rf"([{CJK_RANGES}]+)|([^\W_{CJK_RANGES}]+)")
+
+def normalize(text):
+    """
+    文本归一化：全角转半角并转小写
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        str: 归一化后的文本
+    """
+    return unicodedata.normalize("NFKC", text).lower()
+
+def split_runs(text):
+    """
+    将归一化文本切分为中日韩字串和普通单词
+
+    Args:
+        text: 归一化后的文本
+
+    Returns:
+        list: [(is_cjk, run)]
+
+    >>> split_runs("我用iphone拍照")
+    [(True, '我用'), (False, 'iphone'), (True, '拍照')]
+    """
+    return [(bool(cjk), cjk or word) for cjk, word in TOKEN_PATTERN.findall(text)]
+
+def index_tokens(text):
+    """
+    生成建索引用的词元：中日韩字串取单字和相邻二字组，其余取整词
+
+    Args:
+        text: 原始文本
+
+    Returns:
+        set: 词元集合
+    """
+    tokens = set()
+    for is_cjk, run in split_runs(normalize(text)):
+        if is_cjk:
+            tokens.update(run)
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.add(run)
+    return tokens
+
+def query_tokens(query):
+    """
+    生成查询用的词元：多字中日韩字串只用二字组，单字时用单字
+
+    Args:
+        query: 查询文本
+
+    Returns:
+        tuple: (tokens, cjk_runs) 词元集合和需要做连续性校验的中日韩字串
+    """
+    tokens = set()
+    cjk_runs = []
+    for is_cjk, run in split_runs(normalize(query)):
+        if is_cjk:
+            cjk_runs.append(run)
+            if len(run) == 1:
+                tokens.add(run)
+            else:
+                tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.add(run)
+    return tokens, cjk_runs
+
+class TranscriptIndex:
+    """
+    转写倒排索引
+
+    分段入库时增量建立索引，查询时按倒排表从短到长求交集，
+    中文查询再校验原文中是否连续出现，避免二字组拼凑出的误命中。
+    检索耗时只与命中的倒排表长度相关，不随会话时长线性增长。
+    """
+
+    def __init__(self):
+        """初始化索引"""
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """清空索引"""
+        with self.lock:
+            self.postings = {}
+            self.documents = {}
+
+    def add(self, entry):
+        """
+        添加或替换一个分段
+
+        Args:
+            entry: 转写记录，至少包含 id 和 text
+        """
+        segment_id = entry["id"]
+        with self.lock:
+            if segment_id in self.documents:
+                self.remove_locked(segment_id)
+            self.documents[segment_id] = (normalize(entry["text"]), entry)
+            for token in index_tokens(entry["text"]):
+                self.postings.setdefault(token, set()).add(segment_id)
+
+    def remove_locked(self, segment_id):
+        """
+        从索引中删除一个分段，调用方需持有锁
+
+        Args:
+            segment_id: 分段编号
+        """
+        _, entry = self.documents.pop(segment_id)
+        for token in index_tokens(entry["text"]):
+            ids = self.postings.get(token)
+            if ids is not None:
+                ids.discard(segment_id)
+                if not ids:
+                    del self.postings[token]
+
+    def search(self, query, limit=50):
+        """
+        检索包含查询中所有词的分段
+
+        Args:
+            query: 查询文本
+            limit: 最多返回的分段数
+
+        Returns:
+            tuple: (entries, total) 按分段编号排序的命中记录和命中总数
+        """
+        tokens, cjk_runs = query_tokens(query)
+        if not tokens:
+            return [], 0
+
+        with self.lock:
+            postings = sorted((self.postings.get(token, set()) for token in tokens), key=len)
+            if not postings[0]:
+                return [], 0
+            candidates = set(postings[0])
+            for ids in postings[1:]:
+                candidates &= ids
+                if not candidates:
+                    return [], 0
+
+            matches = []
+            for segment_id in sorted(candidates):
+                normalized, entry = self.documents[segment_id]
+                if all(run in normalized for run in cjk_runs):
+                    matches.append(entry)
+
+        return matches[:limit], len(matches)
+
+    def get_status(self):
+        """
+        获取索引规模
+
+        Returns:
+            dict: 分段数和词元数
+        """
+        return {"segments": len(self.documents), "tokens": len(self.postings)}
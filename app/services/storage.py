@@ -0,0 +1,324 @@
+"""
+SQLite 持久化服务
+"""
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+from app.core.logging import logger
+from app.config import STORAGE_CONFIG
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    model TEXT,
+    language TEXT,
+    config TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_started ON sessions (started_at);
+
+CREATE TABLE IF NOT EXISTS segments (
+    session_id TEXT NOT NULL,
+    segment_id INTEGER NOT NULL,
+    seq INTEGER,
+    start_ms INTEGER NOT NULL,
+    end_ms INTEGER NOT NULL,
+    timestamp TEXT,
+    text TEXT NOT NULL,
+    confidence REAL,
+    corrected INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (session_id, segment_id)
+);
+CREATE INDEX IF NOT EXISTS idx_segments_time ON segments (session_id, start_ms);
+
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+class TranscriptStore:
+    """
+    转写持久化存储
+
+    写操作只是入队，由后台写线程攒批后在一个事务里提交，转写线程不会被磁盘 IO 阻塞；
+    数据库使用 WAL 模式，读请求各自打开连接，与写线程互不阻塞。
+    """
+
+    def __init__(self):
+        """初始化存储，创建数据库和表结构"""
+        self.config = STORAGE_CONFIG
+        self.enabled = self.config["enabled"]
+        self.path = self.config["path"]
+        self.q = queue.Queue()
+        self.writer = None
+        self.written = 0
+        self.batches = 0
+        if not self.enabled:
+            return
+
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = self.connect()
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+            finally:
+                conn.close()
+            self.writer = threading.Thread(target=self.writer_loop, daemon=True)
+            self.writer.start()
+            logger.info(f"转写数据库已就绪: {self.path}")
+        except Exception as e:
+            logger.error(f"初始化转写数据库失败: {str(e)}")
+            self.enabled = False
+
+    def connect(self):
+        """
+        打开一个数据库连接
+
+        Returns:
+            sqlite3.Connection: 数据库连接
+        """
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def read(self, sql, params=()):
+        """
+        执行一次只读查询，每次使用独立连接
+
+        Args:
+            sql: SQL 语句
+            params: 参数
+
+        Returns:
+            list: 查询结果（字典列表）
+        """
+        conn = self.connect()
+        try:
+            return [dict(row) for row in conn.execute(sql, params).fetchall()]
+        finally:
+            conn.close()
+
+    def submit(self, sql, params):
+        """
+        提交一个写操作到后台写线程
+
+        Args:
+            sql: SQL 语句
+            params: 参数
+        """
+        if self.enabled:
+            self.q.put((sql, params))
+
+    def writer_loop(self):
+        """后台写线程：攒批提交"""
+        conn = self.connect()
+        batch_size = self.config["batch_size"]
+        flush_interval = self.config["flush_interval"]
+        while True:
+            item = self.q.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.time() + flush_interval
+            stop = False
+            while len(batch) < batch_size:
+                try:
+                    item = self.q.get(timeout=max(deadline - time.time(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                with conn:
+                    for sql, params in batch:
+                        conn.execute(sql, params)
+                self.written += len(batch)
+                self.batches += 1
+            except Exception as e:
+                logger.error(f"写入转写数据库失败: {str(e)}")
+            if stop:
+                break
+        conn.close()
+
+    def close(self):
+        """写入剩余数据并停止写线程"""
+        if self.writer is not None and self.writer.is_alive():
+            self.q.put(None)
+            self.writer.join(timeout=5)
+
+    def start_session(self, session_id, model, language, config):
+        """
+        记录会话开始
+
+        Args:
+            session_id: 会话编号
+            model: 模型名称
+            language: 语言设置
+            config: 会话开始时的参数快照
+        """
+        self.submit(
+            "INSERT OR REPLACE INTO sessions (id, started_at, model, language, config) VALUES (?, ?, ?, ?, ?)",
+            (session_id, time.time(), model, language, json.dumps(config, ensure_ascii=False))
+        )
+
+    def end_session(self, session_id):
+        """
+        记录会话结束
+
+        Args:
+            session_id: 会话编号
+        """
+        self.submit("UPDATE sessions SET ended_at = ? WHERE id = ?", (time.time(), session_id))
+
+    def save_segment(self, session_id, entry):
+        """
+        保存或替换一个分段
+
+        Args:
+            session_id: 会话编号
+            entry: 转写记录
+        """
+        self.submit(
+            "INSERT OR REPLACE INTO segments (session_id, segment_id, seq, start_ms, end_ms, timestamp, "
+            "text, confidence, corrected, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                session_id, entry["id"], entry.get("seq"), entry["start_ms"], entry["end_ms"],
+                entry["timestamp"], entry["text"], float(entry["confidence"]),
+                int(bool(entry.get("corrected"))), time.time()
+            )
+        )
+
+    def delete_segments(self, session_id):
+        """
+        删除会话的全部分段
+
+        Args:
+            session_id: 会话编号
+        """
+        self.submit("DELETE FROM segments WHERE session_id = ?", (session_id,))
+
+    def save_setting(self, key, value):
+        """
+        保存一项设置
+
+        Args:
+            key: 设置名
+            value: 可 JSON 序列化的值
+        """
+        self.submit(
+            "INSERT OR REPLACE INTO settings (key, value, updated_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value, ensure_ascii=False), time.time())
+        )
+
+    def load_setting(self, key):
+        """
+        读取一项设置（同步读取，用于启动时恢复）
+
+        Args:
+            key: 设置名
+
+        Returns:
+            任意: 设置值，不存在时为 None
+        """
+        if not self.enabled:
+            return None
+        rows = self.read("SELECT value FROM settings WHERE key = ?", (key,))
+        return json.loads(rows[0]["value"]) if rows else None
+
+    def list_sessions(self, limit=50, offset=0):
+        """
+        按开始时间倒序列出会话
+
+        Args:
+            limit: 返回数量
+            offset: 偏移
+
+        Returns:
+            list: 会话列表
+        """
+        if not self.enabled:
+            return []
+        return self.read(
+            "SELECT s.id, s.started_at, s.ended_at, s.model, s.language, "
+            "(SELECT COUNT(*) FROM segments g WHERE g.session_id = s.id) AS segments "
+            "FROM sessions s ORDER BY s.started_at DESC LIMIT ? OFFSET ?",
+            (limit, offset)
+        )
+
+    def get_session(self, session_id):
+        """
+        获取会话详情及其参数快照
+
+        Args:
+            session_id: 会话编号
+
+        Returns:
+            dict: 会话信息，不存在时为 None
+        """
+        if not self.enabled:
+            return None
+        rows = self.read("SELECT * FROM sessions WHERE id = ?", (session_id,))
+        if not rows:
+            return None
+        session = rows[0]
+        session["config"] = json.loads(session["config"]) if session["config"] else {}
+        return session
+
+    def query_segments(self, session_id, start_ms=None, end_ms=None, limit=1000):
+        """
+        按时间范围查询会话的分段
+
+        Args:
+            session_id: 会话编号
+            start_ms: 起始偏移（含），为空表示不限
+            end_ms: 结束偏移（不含），为空表示不限
+            limit: 返回数量
+
+        Returns:
+            list: 按开始时间排序的分段
+        """
+        if not self.enabled:
+            return []
+        sql = "SELECT segment_id AS id, seq, start_ms, end_ms, timestamp, text, confidence, corrected " \
+              "FROM segments WHERE session_id = ?"
+        params = [session_id]
+        if start_ms is not None:
+            sql += " AND end_ms > ?"
+            params.append(start_ms)
+        if end_ms is not None:
+            sql += " AND start_ms < ?"
+            params.append(end_ms)
+        sql += " ORDER BY start_ms LIMIT ?"
+        params.append(limit)
+        return self.read(sql, params)
+
+    def get_status(self):
+        """
+        获取存储状态
+
+        Returns:
+            dict: 状态信息
+        """
+        return {
+            "enabled": self.enabled,
+            "path": self.path,
+            "pending": self.q.qsize(),
+            "written": self.written,
+            "batches": self.batches
+        }
+
+# 创建全局存储服务实例
+transcript_store = TranscriptStore()
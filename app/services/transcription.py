@@ -4,16 +4,32 @@
 import time
 import queue
 import threading
-import asyncio
 import numpy as np
 import re
+import bisect
+import uuid
+import contextlib
 from app.core.logging import logger
 from app.config import (
-    SAMPLE_RATE, BLOCK_SIZE, BUFFER_SECONDS, DEFAULT_LANGUAGE,
-    ANTI_HALLUCINATION_CONFIG, HALLUCINATION_PATTERNS
+    SAMPLE_RATE, BLOCK_SIZE, DEFAULT_LANGUAGE, AUTO_LANGUAGE,
+    ANTI_HALLUCINATION_CONFIG, HALLUCINATION_PATTERNS, ESCALATION_CONFIG,
+    PREPROCESS_CONFIG, PREPROCESS_MODES, ADAPTIVE_GATING_CONFIG, FEATURE_CACHE_CONFIG
 )
 from app.services.whisper import whisper_service
+from app.services.model_loader import model_loader
 from app.services.audio import audio_service
+from app.services.escalation import escalation_service
+from app.services.broadcast import broadcaster
+from app.services.search import TranscriptIndex
+from app.services.storage import transcript_store
+from app.services.archive import audio_archive
+from app.services.cache import result_cache
+from app.services.language import LanguageDetector
+from app.services.vad import StreamingVad
+from app.services.denoise import SpectralGate, highpass_diff, normalize_peak
+from app.services.gating import AdaptiveThresholds
+from app.services.window import WindowController
+from app.services.features import feature_cache, HOP_LENGTH
 
 class TranscriptionService:
     """语音转写服务类"""
@@ -22,14 +38,28 @@ class TranscriptionService:
         """初始化转写服务"""
         self.q = queue.Queue()
         self.buffer = np.empty((0, 1), dtype='float32')
+        self.buffer_offset = 0  # 当前缓冲区起点在音频流中的绝对采样偏移
+        self.vad = StreamingVad()  # 语音区间只计算一次，静音跳过和模型裁剪共用
+        self.denoiser = SpectralGate()  # 跨窗口保持噪声底估计
+        self.preprocess_stats = {"windows": 0, "total_ms": 0.0, "max_ms": 0.0}
+        self.noise_floor = AdaptiveThresholds()  # 会话级环境噪声估计
+        self.window_stats = {"total": 0, "inferred": 0}
+        self.window_controller = WindowController()  # 按实测实时率调节窗口长度
         self.transcript = []
         self.last_time = time.time()
         self.running = False
+        self.source = "microphone"  # 音频来源：microphone 或 stream
         self.current_language = DEFAULT_LANGUAGE
-        self.connected_websockets = set()
+        self.language_detector = LanguageDetector()  # 自动语言模式下的会话级缓存
         self.start_time = None  # 新增：记录录音开始时间
+        self.session_id = None  # 当前会话编号，持久化时使用
         self.display_mode = "segments"  # 显示模式
         self.continuous_text = ""  # 新增：用于存储连续显示的文本
+        self.transcript_lock = threading.Lock()
+        self.search_index = TranscriptIndex()  # 随分段到达增量更新的倒排索引
+        self.next_segment_id = 0  # 分段编号，重解码修正时用于定位
+        self.transcript_epoch = 0  # 清空或重新开始时递增，用于丢弃过期的修正
+        self.cleared_seq = 0  # 最近一次清空事件的序号，续传游标早于它时需先清空客户端
         
         # 从配置文件加载反幻觉参数
         config = ANTI_HALLUCINATION_CONFIG
@@ -38,6 +68,13 @@ class TranscriptionService:
         self.silence_threshold = config["silence_threshold"]
         self.zcr_threshold = config["zcr_threshold"]
         self.hallucination_patterns = HALLUCINATION_PATTERNS
+        
+        escalation_service.set_result_handler(self.apply_correction)
+        
+        # 恢复上次保存的可调参数
+        saved = transcript_store.load_setting("tuning")
+        if saved:
+            self.apply_tunable_config(saved)
     
     def audio_callback(self, indata, frames, time_info, status):
         """
@@ -53,50 +90,153 @@ class TranscriptionService:
             logger.warning(f"音频状态异常: {status}")
         self.q.put(indata.copy())
     
-    async def broadcast_to_websockets(self, event_type, data):
+    def feed_audio(self, samples):
+        """
+        推入一段外部音频（音频流会话使用，代替麦克风回调）
+        
+        Args:
+            samples: 一维 float32 音频，采样率为 SAMPLE_RATE
+        """
+        self.q.put(samples.reshape(-1, 1))
+    
+    def open_source(self):
+        """
+        打开当前会话的音频来源
+        
+        Returns:
+            上下文管理器: 麦克风输入流；音频流会话不需要打开设备
+        """
+        if self.source == "stream":
+            return contextlib.nullcontext()
+        return audio_service.create_input_stream(
+            samplerate=SAMPLE_RATE, 
+            channels=1, 
+            dtype='float32',
+            callback=self.audio_callback, 
+            blocksize=BLOCK_SIZE
+        )
+    
+    def broadcast_to_websockets(self, event_type, data):
         """
-        向所有连接的WebSocket客户端广播消息
+        向所有连接的WebSocket客户端广播消息，可在转写线程中直接调用
         
         Args:
             event_type: 事件类型
             data: 要发送的数据
+            
+        Returns:
+            int: 事件序号
         """
-        for websocket in self.connected_websockets:
-            try:
-                await websocket.send_json({"event": event_type, "data": data})
-            except Exception as e:
-                logger.error(f"WebSocket发送消息失败: {str(e)}")
+        return broadcaster.publish(event_type, data)
     
-    def preprocess_audio(self, audio_data):
+    def preprocess_audio(self, audio_data, mode=None):
         """
-        音频预处理：去噪和归一化
+        音频预处理：按配置的模式降噪和归一化，并统计每个窗口的耗时
+        
+        归一化的增益逐窗口变化，自适应门限的噪声底估计和静音判断需要在同一幅度尺度上比较，
+        因此另外返回归一化之前的信号供其使用。
         
         Args:
             audio_data: 原始音频数据
+            mode: 预处理模式，默认使用 PREPROCESS_CONFIG["mode"]
             
         Returns:
-            numpy.ndarray: 预处理后的音频数据 (float32)
-        """
-        # 确保输入是 float32 类型
-        audio_data = audio_data.astype(np.float32)
-        
-        # 归一化音频
-        max_val = np.max(np.abs(audio_data))
-        if max_val > 0:
-            audio_data = audio_data / max_val
-        
-        # 简单的高通滤波器去除低频噪音
-        # 使用差分近似高通滤波
-        if len(audio_data) > 1:
-            filtered = np.diff(audio_data)
-            # 补齐长度
-            filtered = np.append(filtered, 0)
-            result = filtered * 0.5 + audio_data * 0.5
+            tuple: (samples, gate_samples) 送入模型的音频 (float32) 和归一化之前供自适应门限使用的音频
+        """
+        mode = mode or PREPROCESS_CONFIG["mode"]
+        started = time.perf_counter()
+        
+        if mode == "spectral_gate":
+            gate_samples = self.denoiser.process(audio_data)
+            result = normalize_peak(gate_samples)
+        elif mode == "highpass":
+            gate_samples = audio_data
+            result = highpass_diff(audio_data)
         else:
-            result = audio_data
+            gate_samples = audio_data
+            result = audio_data.astype(np.float32)
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.preprocess_stats["windows"] += 1
+        self.preprocess_stats["total_ms"] += elapsed_ms
+        self.preprocess_stats["max_ms"] = max(self.preprocess_stats["max_ms"], elapsed_ms)
+        
+        return result, gate_samples
+
+    def get_tunable_config(self):
+        """
+        获取可通过 API 调整的参数，用于持久化和会话快照
+        
+        Returns:
+            dict: 参数字典
+        """
+        return {
+            "confidence_threshold": self.confidence_threshold,
+            "energy_threshold": self.energy_threshold,
+            "silence_threshold": self.silence_threshold,
+            "zcr_threshold": self.zcr_threshold,
+            "temperature": ANTI_HALLUCINATION_CONFIG["temperature"],
+            "no_speech_threshold": ANTI_HALLUCINATION_CONFIG["no_speech_threshold"],
+            "adaptive_gating": ADAPTIVE_GATING_CONFIG["enabled"],
+            "preprocess_mode": PREPROCESS_CONFIG["mode"]
+        }
+
+    def apply_tunable_config(self, config):
+        """
+        应用保存的可调参数，缺失的项保持不变
+        
+        Args:
+            config: 参数字典
+        """
+        for key in ("confidence_threshold", "energy_threshold", "silence_threshold", "zcr_threshold"):
+            if key in config:
+                setattr(self, key, config[key])
+        for key in ("temperature", "no_speech_threshold"):
+            if key in config:
+                ANTI_HALLUCINATION_CONFIG[key] = config[key]
+        if "adaptive_gating" in config:
+            ADAPTIVE_GATING_CONFIG["enabled"] = config["adaptive_gating"]
+        if config.get("preprocess_mode") in PREPROCESS_MODES:
+            PREPROCESS_CONFIG["mode"] = config["preprocess_mode"]
+
+    def persist_tunable_config(self):
+        """保存当前可调参数，重启后自动恢复"""
+        transcript_store.save_setting("tuning", self.get_tunable_config())
+
+    def set_preprocess_mode(self, mode):
+        """
+        设置预处理模式
+        
+        Args:
+            mode: 预处理模式
+            
+        Returns:
+            dict: 操作状态和消息
+        """
+        if mode not in PREPROCESS_MODES:
+            return {"status": "error", "message": f"不支持的预处理模式: {mode}"}
         
-        # 确保返回 float32 类型
-        return result.astype(np.float32)
+        PREPROCESS_CONFIG["mode"] = mode
+        self.denoiser.reset()
+        self.persist_tunable_config()
+        return {"status": "success", "message": f"已切换到预处理模式: {mode}"}
+
+    def get_preprocess_status(self):
+        """
+        获取预处理模式和每窗口耗时统计
+        
+        Returns:
+            dict: 状态信息
+        """
+        stats = self.preprocess_stats
+        windows = stats["windows"]
+        return {
+            "mode": PREPROCESS_CONFIG["mode"],
+            "modes": PREPROCESS_MODES,
+            "windows": windows,
+            "avg_ms": stats["total_ms"] / windows if windows else 0.0,
+            "max_ms": stats["max_ms"]
+        }
 
     def is_silence(self, audio_data):
         """
@@ -131,15 +271,45 @@ class TranscriptionService:
             spectral_centroid = 0
         
         # 综合判断：低能量、低零交叉率且频谱中心异常
-        is_silent = (energy < self.silence_threshold and 
-                    zcr < self.zcr_threshold) or \
-                   (energy < self.energy_threshold and spectral_centroid < 100)
+        thresholds = self.gate_thresholds()
+        is_silent = (energy < thresholds["silence_threshold"] and 
+                    zcr < thresholds["zcr_threshold"]) or \
+                   (energy < thresholds["energy_threshold"] and spectral_centroid < 100)
         
         if is_silent:
             logger.debug(f"检测到静音: energy={energy:.4f}, zcr={zcr:.4f}, spectral_centroid={spectral_centroid:.2f}")
         
         return is_silent
 
+    def gate_thresholds(self):
+        """
+        获取当前生效的静音门限：自适应估计就绪后使用估计值，否则使用静态配置
+        
+        Returns:
+            dict: silence_threshold、energy_threshold 和 zcr_threshold
+        """
+        if self.noise_floor.ready:
+            return self.noise_floor.thresholds()
+        return {
+            "silence_threshold": self.silence_threshold,
+            "energy_threshold": self.energy_threshold,
+            "zcr_threshold": self.zcr_threshold
+        }
+
+    def get_gating_status(self):
+        """
+        获取门限状态和窗口推理统计
+        
+        Returns:
+            dict: 状态信息
+        """
+        return {
+            "adaptive": self.noise_floor.get_status(),
+            "active_thresholds": self.gate_thresholds(),
+            "windows": self.window_stats["total"],
+            "inferred_windows": self.window_stats["inferred"]
+        }
+
     def contains_hallucination(self, text):
         """
         检测文本是否包含已知的幻觉内容
@@ -207,92 +377,320 @@ class TranscriptionService:
             
         return True
 
+    def should_escalate(self, text, confidence):
+        """
+        判断被过滤的分段是否值得交给大模型重解码
+        
+        Args:
+            text: 转写文本
+            confidence: 置信度
+            
+        Returns:
+            bool: 是否需要重解码
+        """
+        if not ESCALATION_CONFIG["enabled"] or not text or len(text.strip()) == 0:
+            return False
+        # 置信度极低的通常是噪音，重解码也救不回来
+        if confidence < ESCALATION_CONFIG["min_confidence"]:
+            return False
+        return confidence < self.confidence_threshold or self.contains_hallucination(text)
+
+    def format_timestamp(self):
+        """
+        计算相对录音开始时间的时间戳
+        
+        Returns:
+            str: HH:MM:SS 格式的时间戳
+        """
+        elapsed = int(time.time() - self.start_time)
+        hours = elapsed // 3600
+        minutes = (elapsed % 3600) // 60
+        seconds = elapsed % 60
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+    def allocate_segment_id(self):
+        """
+        分配一个新的分段编号
+        
+        Returns:
+            int: 分段编号
+        """
+        with self.transcript_lock:
+            segment_id = self.next_segment_id
+            self.next_segment_id += 1
+            return segment_id
+
+    def shares_features(self):
+        """
+        判断本窗口的特征是否会被多次使用，只有这时预先缓存特征才能省下计算
+        
+        Returns:
+            bool: 需要语言检测，或重解码模型已加载且 mel 维度与当前模型相同时为 True
+        """
+        if not FEATURE_CACHE_CONFIG["enabled"]:
+            return False
+        if self.current_language == AUTO_LANGUAGE and self.language_detector.needs_check():
+            return True
+        if not ESCALATION_CONFIG["enabled"]:
+            return False
+        # 重解码模型在首次重解码时才加载，之前无法确认，按不共用处理
+        escalation_bins = whisper_service.mel_bins(ESCALATION_CONFIG["model"])
+        return escalation_bins is not None and escalation_bins == whisper_service.mel_bins(whisper_service.model_name)
+    
+    def resolve_language(self, samples):
+        """
+        确定本窗口使用的语言，自动模式下使用会话缓存的检测结果
+        
+        Args:
+            samples: 本窗口送入模型的音频
+            
+        Returns:
+            str: 语言代码
+        """
+        if self.current_language != AUTO_LANGUAGE:
+            return self.current_language
+        
+        language, event = self.language_detector.resolve(samples)
+        if event:
+            self.broadcast_to_websockets('language', event)
+        return language
+
+    def handle_segment(self, seg, samples, language):
+        """
+        处理单个转写分段：高质量的直接推送，可疑的提交重解码
+        
+        Args:
+            seg: faster-whisper 返回的分段
+            samples: 本窗口送入模型的音频
+            language: 本窗口使用的语言
+        """
+        confidence = float(np.exp(seg.avg_logprob))
+        text = seg.text.strip()
+        # 分段在音频流中的绝对位置（毫秒）
+        window_ms = self.buffer_offset * 1000 // SAMPLE_RATE
+        start_ms = window_ms + int(seg.start * 1000)
+        end_ms = window_ms + int(seg.end * 1000)
+        
+        # 验证转写质量
+        if self.validate_transcription_quality(text, confidence):
+            segment_id = self.allocate_segment_id()
+            timestamp = self.format_timestamp()
+            
+            # 只推送高质量的分段内容；发布、入库和建索引在同一把锁内完成，
+            # 保证续传快照与序号一致，且 clear 不会夹在中间留下过期的索引
+            with self.transcript_lock:
+                seq = self.broadcast_to_websockets('transcription', {
+                    'id': segment_id,
+                    'text': text,
+                    'timestamp': timestamp,
+                    'start_ms': start_ms,
+                    'end_ms': end_ms,
+                    'show_timestamp': True,
+                    'confidence': confidence,
+                    'mode': 'segments'
+                })
+                entry = {
+                    "id": segment_id,
+                    "seq": seq,
+                    "text": text,
+                    "timestamp": timestamp,
+                    "start_ms": start_ms,
+                    "end_ms": end_ms,
+                    "confidence": confidence
+                }
+                self.transcript.append(entry)
+                self.search_index.add(entry)
+            transcript_store.save_segment(self.session_id, entry)
+            logger.info(f"转写成功: '{text}' (confidence: {confidence:.3f})")
+        elif self.should_escalate(text, confidence):
+            # 截取分段对应的音频，两侧稍作补齐
+            padding = ESCALATION_CONFIG["padding_seconds"]
+            start = max(int((seg.start - padding) * SAMPLE_RATE), 0)
+            start -= start % HOP_LENGTH  # 与特征帧对齐，重解码可复用本窗口的 mel 特征
+            end = min(int((seg.end + padding) * SAMPLE_RATE), len(samples))
+            if end - start <= 0:
+                return
+            escalation_service.submit({
+                "id": self.allocate_segment_id(),
+                "epoch": self.transcript_epoch,
+                "session_id": self.session_id,
+                "timestamp": self.format_timestamp(),
+                "start_ms": start_ms,
+                "end_ms": end_ms,
+                "audio": samples[start:end].copy(),
+                "stream_offset": self.buffer_offset + start,
+                "language": language,
+                "original_text": text,
+                "original_confidence": confidence
+            })
+            logger.debug(f"低质量转写已提交重解码: '{text}' (confidence: {confidence:.3f})")
+        else:
+            logger.debug(f"过滤低质量转写: '{text}' (confidence: {confidence:.3f})")
+
+    def apply_correction(self, job, text, confidence):
+        """
+        重解码结果回调：通过质量校验后插入转写记录并推送修正事件
+        
+        Args:
+            job: 重解码任务
+            text: 重解码文本
+            confidence: 重解码置信度
+        """
+        if job["epoch"] != self.transcript_epoch:
+            logger.debug("转写记录已清空，丢弃过期的重解码结果")
+            return
+        if not self.validate_transcription_quality(text, confidence):
+            logger.debug(f"重解码结果仍不合格: '{text}' (confidence: {confidence:.3f})")
+            return
+        
+        entry = {
+            "id": job["id"],
+            "text": text,
+            "timestamp": job["timestamp"],
+            "start_ms": job["start_ms"],
+            "end_ms": job["end_ms"],
+            "confidence": confidence,
+            "corrected": True
+        }
+        with self.transcript_lock:
+            # 在锁内再次检查，避免与 clear 交错时把过期结果写回
+            if job["epoch"] != self.transcript_epoch:
+                logger.debug("转写记录已清空，丢弃过期的重解码结果")
+                return
+            entry["seq"] = self.broadcast_to_websockets('correction', {
+                'id': job["id"],
+                'text': text,
+                'timestamp': job["timestamp"],
+                'start_ms': job["start_ms"],
+                'end_ms': job["end_ms"],
+                'show_timestamp': True,
+                'confidence': confidence,
+                'original_text': job["original_text"],
+                'mode': 'segments'
+            })
+            # 按分段编号插回原来的位置
+            ids = [item["id"] for item in self.transcript]
+            self.transcript.insert(bisect.bisect(ids, job["id"]), entry)
+            self.search_index.add(entry)
+        transcript_store.save_segment(job["session_id"], entry)
+        
+        logger.info(f"重解码修正: '{job['original_text']}' -> '{text}' (confidence: {confidence:.3f})")
+
     def listen_loop(self):
         """语音转写主循环，从队列获取音频数据并进行转写"""
         logger.info("开始语音转写线程")
-        with audio_service.create_input_stream(
-            samplerate=SAMPLE_RATE, 
-            channels=1, 
-            dtype='float32',
-            callback=self.audio_callback, 
-            blocksize=BLOCK_SIZE
-        ):
+        with self.open_source():
             while self.running:
                 try:
                     data = self.q.get(timeout=1)
                     self.buffer = np.append(self.buffer, data, axis=0)
+                    self.vad.feed(data[:, 0])
+                    audio_archive.write(data[:, 0])
 
-                    if time.time() - self.last_time > BUFFER_SECONDS:
+                    if time.time() - self.last_time > self.window_controller.window_seconds:
                         if len(self.buffer) >= SAMPLE_RATE:
                             samples = self.buffer[:, 0]
                             
+                            # 补齐本窗口的 VAD 结果，取出语音区间
+                            self.vad.flush()
+                            regions = self.vad.speech_regions(
+                                self.buffer_offset, self.buffer_offset + len(samples)
+                            )
+                            
                             # 音频预处理 - 确保数据类型正确
-                            samples = self.preprocess_audio(samples)
+                            samples, gate_samples = self.preprocess_audio(samples)
                             # 再次确保是 float32 类型
                             samples = samples.astype(np.float32)
                             
-                            # 检查是否为静音
-                            if not self.is_silence(samples):
+                            # 持续跟踪环境噪声底，更新静音门限（使用归一化之前的信号）
+                            self.noise_floor.observe(gate_samples, speech=bool(regions))
+                            self.window_stats["total"] += 1
+                            
+                            # 检查是否为静音：自适应门限与噪声底同在归一化之前的尺度上比较；
+                            # 静态门限是按预处理后的音频调定的，预热期间和关闭自适应时仍用预处理后的音频
+                            gate_input = gate_samples if self.noise_floor.ready else samples
+                            if not regions:
+                                logger.debug("VAD 未检测到语音，跳过转写")
+                            elif not self.is_silence(gate_input):
+                                self.window_stats["inferred"] += 1
                                 try:
-                                    segments, _ = whisper_service.transcribe(samples, self.current_language)
+                                    inference_started = time.perf_counter()
+                                    # 本窗口还会被再次解码时预先计算特征，语言检测、转写和重解码共用
+                                    if self.shares_features():
+                                        whisper_service.feed_features(samples, self.buffer_offset)
+                                    language = self.resolve_language(samples)
+                                    segments, _ = whisper_service.transcribe(
+                                        samples, language,
+                                        clip_timestamps=self.vad.to_clip_timestamps(regions)
+                                    )
                                     segments_list = list(segments)
+                                    self.window_controller.record(
+                                        time.perf_counter() - inference_started, len(samples) / SAMPLE_RATE
+                                    )
                                     
                                     for seg in segments_list:
-                                        confidence = np.exp(seg.avg_logprob)
-                                        text = seg.text.strip()
-                                        
-                                        # 验证转写质量
-                                        if self.validate_transcription_quality(text, confidence):
-                                            elapsed = int(time.time() - self.start_time)
-                                            hours = elapsed // 3600
-                                            minutes = (elapsed % 3600) // 60
-                                            seconds = elapsed % 60
-                                            timestamp = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
-                                            
-                                            # 只推送高质量的分段内容
-                                            asyncio.run(self.broadcast_to_websockets('transcription', {
-                                                'text': text,
-                                                'timestamp': timestamp,
-                                                'show_timestamp': True,
-                                                'confidence': confidence,
-                                                'mode': 'segments'
-                                            }))
-                                            self.transcript.append({
-                                                "text": text,
-                                                "timestamp": timestamp,
-                                                "confidence": confidence
-                                            })
-                                            logger.info(f"转写成功: '{text}' (confidence: {confidence:.3f})")
-                                        else:
-                                            logger.debug(f"过滤低质量转写: '{text}' (confidence: {confidence:.3f})")
+                                        self.handle_segment(seg, samples, language)
+                                    
+                                    if self.current_language == AUTO_LANGUAGE and segments_list:
+                                        self.language_detector.report_confidence(
+                                            np.mean([np.exp(seg.avg_logprob) for seg in segments_list])
+                                        )
                                             
                                 except Exception as e:
                                     logger.error(f"转写过程出错: {str(e)}")
-                                    asyncio.run(self.broadcast_to_websockets('error', {'message': f'转写错误: {str(e)}'}))
+                                    self.broadcast_to_websockets('error', {'message': f'转写错误: {str(e)}'})
                             else:
                                 logger.debug("检测到静音，跳过转写")
 
+                        self.buffer_offset += len(self.buffer)
+                        self.vad.discard_before(self.buffer_offset)
                         self.buffer = np.empty((0, 1), dtype='float32')
                         self.last_time = time.time()
                 except queue.Empty:
                     continue
                 except Exception as e:
                     logger.error(f"转写线程异常: {str(e)}")
-                    asyncio.run(self.broadcast_to_websockets('error', {'message': f'系统错误: {str(e)}'}))
+                    self.broadcast_to_websockets('error', {'message': f'系统错误: {str(e)}'})
                     
         logger.info("语音转写线程已停止")
     
-    def start(self):
+    def start(self, source="microphone"):
         """
         开始语音转写
         
+        Args:
+            source: 音频来源，microphone 为本机输入设备，stream 为通过 feed_audio 推入的音频
+        
         Returns:
             dict: 操作状态
         """
+        # 加载完成时会直接替换模型，会话中途不能换模型
+        if not self.running and model_loader.active is not None:
+            return {"status": "error", "message": "模型加载中，请等待加载完成或取消任务后再开始转写"}
         if not self.running:
             self.running = True
-            self.transcript = []  # 清空之前的转写记录
+            self.source = source
+            self.q = queue.Queue()
+            with self.transcript_lock:
+                self.transcript = []  # 清空之前的转写记录
+                self.search_index.clear()
+                self.transcript_epoch += 1
+            self.language_detector.reset()  # 每个会话重新检测语言
+            self.buffer = np.empty((0, 1), dtype='float32')
+            self.buffer_offset = 0
+            self.vad.reset()
+            feature_cache.reset()
+            self.denoiser.reset()
+            self.noise_floor.reset()
+            self.window_stats = {"total": 0, "inferred": 0}
+            self.window_controller.reset()
             self.start_time = time.time()  # 新增：记录开始时间
+            self.session_id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+            transcript_store.start_session(
+                self.session_id, whisper_service.model_name, self.current_language,
+                self.get_tunable_config()
+            )
+            audio_archive.open_session(self.session_id)
             # 启动后台线程
             thread = threading.Thread(target=self.listen_loop)
             thread.daemon = True
@@ -310,22 +708,121 @@ class TranscriptionService:
         """
         if self.running:
             self.running = False
+            transcript_store.end_session(self.session_id)
+            audio_archive.close_session()
             logger.info("停止语音转写")
             return {"status": "stopped"}
         return {"status": "already_stopped"}
     
     def clear(self):
         """
-        清空转写记录
+        清空内存中的转写记录和检索索引，已保存的历史分段不受影响
         
         Returns:
             dict: 操作状态
         """
-        self.transcript = []
+        with self.transcript_lock:
+            self.transcript = []
+            self.transcript_epoch += 1
+            self.cleared_seq = self.broadcast_to_websockets('clear', {})
+            self.search_index.clear()
         self.continuous_text = ""  # 清空连续文本
         logger.info("清空转写记录")
         return {"status": "cleared"}
     
+    def replay_since(self, since):
+        """
+        生成续传快照：游标之后的转写事件，以及快照对应的序号
+        
+        在转写锁内读取，发布与入库同样在该锁内完成，因此返回的序号之前的
+        转写事件要么在快照中，要么早于游标，客户端不会漏收也不会重复。
+        
+        Args:
+            since: 客户端最后收到的事件序号
+            
+        Returns:
+            tuple: (events, seq) 待补发的 (seq, event_type, data) 列表和快照序号
+        """
+        with self.transcript_lock:
+            seq = broadcaster.seq
+            # 游标超过当前序号说明服务已重启，按从头续传处理
+            if since > seq:
+                since = 0
+            events = []
+            if since < self.cleared_seq:
+                events.append((self.cleared_seq, 'clear', {}))
+            for item in self.transcript:
+                if item["seq"] <= since:
+                    continue
+                events.append((item["seq"], 'correction' if item.get("corrected") else 'transcription', {
+                    'id': item["id"],
+                    'text': item["text"],
+                    'timestamp': item["timestamp"],
+                    'start_ms': item["start_ms"],
+                    'end_ms': item["end_ms"],
+                    'show_timestamp': True,
+                    'confidence': item["confidence"],
+                    'mode': 'segments'
+                }))
+        events.sort(key=lambda event: event[0])
+        return events, seq
+
+    def retranscribe(self, session_id, start_ms, end_ms, model_name, language=None, beam_size=5):
+        """
+        使用任意模型重新转写归档音频中的一段
+        
+        Args:
+            session_id: 会话编号
+            start_ms: 起始偏移（毫秒）
+            end_ms: 结束偏移（毫秒）
+            model_name: 模型名称
+            language: 语言代码，为空或 auto 时由模型自动检测
+            beam_size: 束搜索宽度
+            
+        Returns:
+            dict: 操作状态及带绝对偏移的分段列表
+        """
+        audio = audio_archive.read(session_id, start_ms, end_ms)
+        if len(audio) == 0:
+            return {"status": "error", "message": "该时间范围没有归档音频"}
+        
+        if language == AUTO_LANGUAGE:
+            language = None
+        
+        # 相同音频、模型和解码参数的结果直接取缓存
+        key = result_cache.make_key(audio, model_name, language, beam_size=beam_size)
+        cached = result_cache.get(key)
+        if cached is None:
+            segments, info = whisper_service.transcribe(
+                audio, language,
+                model=whisper_service.get_model(model_name),
+                beam_size=beam_size
+            )
+            cached = {
+                "language": info.language,
+                "segments": [
+                    {"start": seg.start, "end": seg.end, "text": seg.text, "avg_logprob": seg.avg_logprob}
+                    for seg in segments
+                ]
+            }
+            result_cache.put(key, cached)
+        
+        results = []
+        for seg in cached["segments"]:
+            results.append({
+                "text": seg["text"].strip(),
+                "start_ms": start_ms + int(seg["start"] * 1000),
+                "end_ms": start_ms + int(seg["end"] * 1000),
+                "confidence": float(np.exp(seg["avg_logprob"]))
+            })
+        logger.info(f"重新转写完成: {session_id} [{start_ms}, {end_ms}) 模型 {model_name}，共 {len(results)} 段")
+        return {
+            "status": "success",
+            "model": model_name,
+            "language": cached["language"],
+            "segments": results
+        }
+
     def save(self, file_path='transcript_output.txt'):
         """
         保存转写结果为文本文件
@@ -363,6 +860,9 @@ class TranscriptionService:
             dict: 操作状态和消息
         """
         self.current_language = language
+        self.language_detector.reset()
+        if language == AUTO_LANGUAGE:
+            return {"status": "success", "message": "已切换到自动检测语言"}
         return {"status": "success", "message": f"已切换到语言: {language}"}
 
     def set_display_mode(self, mode):
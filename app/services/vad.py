@@ -0,0 +1,134 @@
+"""
+流式语音活动检测服务
+"""
+import numpy as np
+from faster_whisper.vad import VadOptions, get_speech_timestamps
+from app.core.logging import logger
+from app.config import SAMPLE_RATE, VAD_CONFIG
+
+class StreamingVad:
+    """
+    流式 VAD
+
+    音频块到达时先累积，攒够 chunk_seconds 后带上少量历史上下文运行一次 Silero VAD，
+    得到的语音区间以流内绝对采样偏移保存并与已有区间合并。转写窗口直接查询
+    这些区间，既用来跳过无语音窗口，也作为 clip_timestamps 交给模型，
+    这样模型内部不必再跑一遍 VAD。
+    """
+
+    def __init__(self):
+        """初始化流式 VAD"""
+        self.config = VAD_CONFIG
+        self.options = VadOptions(
+            threshold=self.config["threshold"],
+            min_silence_duration_ms=self.config["min_silence_duration_ms"],
+            speech_pad_ms=self.config["speech_pad_ms"]
+        )
+        self.chunk_samples = int(self.config["chunk_seconds"] * SAMPLE_RATE)
+        self.context_samples = int(self.config["context_seconds"] * SAMPLE_RATE)
+        # 相邻区间间隔小于最小静音时长时合并
+        self.merge_gap = int(self.config["min_silence_duration_ms"] * SAMPLE_RATE / 1000)
+        self.reset()
+
+    def reset(self):
+        """清空状态，在新会话开始时调用"""
+        self.pending = []
+        self.pending_samples = 0
+        self.context = np.empty(0, dtype=np.float32)
+        self.processed = 0  # 已完成 VAD 的绝对采样偏移
+        self.intervals = []  # [(start, end)] 绝对采样偏移
+
+    def feed(self, block):
+        """
+        输入一个新的音频块
+
+        Args:
+            block: 一维 float32 音频
+        """
+        self.pending.append(block)
+        self.pending_samples += len(block)
+        if self.pending_samples >= self.chunk_samples:
+            self.run()
+
+    def flush(self):
+        """处理所有未检测的音频，在查询窗口区间前调用"""
+        if self.pending_samples > 0:
+            self.run()
+
+    def run(self):
+        """对累积的新音频增量运行 VAD"""
+        new_audio = np.concatenate(self.pending).astype(np.float32)
+        self.pending = []
+        self.pending_samples = 0
+
+        audio = np.concatenate([self.context, new_audio])
+        base = self.processed - len(self.context)
+        try:
+            timestamps = get_speech_timestamps(audio, self.options)
+        except Exception as e:
+            # VAD 失败时保守地把整段视为语音，交给后续环节判断
+            logger.error(f"VAD 检测失败: {str(e)}")
+            timestamps = [{"start": len(self.context), "end": len(audio)}]
+
+        for ts in timestamps:
+            self.add_interval(base + ts["start"], base + ts["end"])
+
+        self.processed += len(new_audio)
+        self.context = audio[-self.context_samples:] if self.context_samples else self.context
+
+    def add_interval(self, start, end):
+        """
+        添加一个语音区间并与已有区间合并
+
+        Args:
+            start: 起始绝对偏移
+            end: 结束绝对偏移
+        """
+        if self.intervals and start <= self.intervals[-1][1] + self.merge_gap:
+            last_start, last_end = self.intervals[-1]
+            self.intervals[-1] = (min(last_start, start), max(last_end, end))
+        else:
+            self.intervals.append((start, end))
+
+    def speech_regions(self, start, end):
+        """
+        查询窗口内的语音区间
+
+        Args:
+            start: 窗口起始绝对偏移
+            end: 窗口结束绝对偏移
+
+        Returns:
+            list: [(start, end)] 相对窗口起点的采样偏移
+        """
+        regions = []
+        for s, e in self.intervals:
+            if e <= start or s >= end:
+                continue
+            regions.append((max(s, start) - start, min(e, end) - start))
+        return regions
+
+    def discard_before(self, offset):
+        """
+        丢弃已经不会再被查询的区间
+
+        Args:
+            offset: 绝对偏移，之前的区间可以丢弃
+        """
+        self.intervals = [(s, e) for s, e in self.intervals if e > offset]
+
+    @staticmethod
+    def to_clip_timestamps(regions):
+        """
+        将区间转换为 faster-whisper 的 clip_timestamps 参数
+
+        Args:
+            regions: [(start, end)] 相对窗口的采样偏移
+
+        Returns:
+            list: [start, end, start, end, ...] 单位为秒
+        """
+        clips = []
+        for s, e in regions:
+            clips.extend([s / SAMPLE_RATE, e / SAMPLE_RATE])
+        return clips
@@ -1,9 +1,14 @@
 """
 Whisper 模型服务
 """
+import os
+import threading
 from faster_whisper import WhisperModel
 from app.core.logging import logger
-from app.config import DEFAULT_MODEL, ANTI_HALLUCINATION_CONFIG
+from app.services.features import feature_cache, CachedFeatureExtractor
+from app.config import (
+    DEFAULT_MODEL, MODEL_CPU_THREADS, ANTI_HALLUCINATION_CONFIG, VAD_CONFIG, FEATURE_CACHE_CONFIG
+)
 
 class WhisperService:
     """Whisper 模型服务类"""
@@ -12,11 +17,59 @@ class WhisperService:
         """初始化 Whisper 服务"""
         self.model = None
         self.model_name = DEFAULT_MODEL
+        self.aux_model = None  # 重解码、重新转写等离线任务使用的附加模型
+        self.aux_model_name = None
+        self.aux_lock = threading.Lock()
         self.load_model(DEFAULT_MODEL)
     
+    @staticmethod
+    def create_model(model_name):
+        """
+        创建一个新的 Whisper 模型实例（不替换当前服务模型）
+        
+        多进程模式下工作进程通过 WHISPRRT_CPU_THREADS 环境变量指定各自的推理线程数。
+        
+        Args:
+            model_name: 模型名称或本地模型目录
+            
+        Returns:
+            WhisperModel: 新的模型实例
+        """
+        model = WhisperModel(
+            model_name, 
+            device="cpu",           
+            compute_type="int8",   
+            cpu_threads=int(os.environ.get("WHISPRRT_CPU_THREADS", MODEL_CPU_THREADS)),
+            num_workers=1 
+        )
+        # 启用特征缓存时，特征提取优先使用按流偏移缓存的 mel 帧
+        if FEATURE_CACHE_CONFIG["enabled"]:
+            model.feature_extractor = CachedFeatureExtractor(model.feature_extractor, feature_cache)
+        return model
+    
+    def get_model(self, model_name):
+        """
+        获取指定名称的模型：与当前模型相同时直接复用，否则使用（必要时加载）附加模型
+        
+        Args:
+            model_name: 模型名称
+            
+        Returns:
+            WhisperModel: 模型实例
+        """
+        if model_name == self.model_name:
+            return self.model
+        with self.aux_lock:
+            if self.aux_model is None or self.aux_model_name != model_name:
+                logger.info(f"正在加载附加模型: {model_name}")
+                self.aux_model = None
+                self.aux_model = self.create_model(model_name)
+                self.aux_model_name = model_name
+            return self.aux_model
+    
     def load_model(self, model_name):
         """
-        加载指定的 Whisper 模型
+        同步加载指定的 Whisper 模型，失败时保留当前模型并抛出异常
         
         Args:
             model_name: 模型名称
@@ -24,65 +77,112 @@ class WhisperService:
         Returns:
             WhisperModel: 加载的模型实例
         """
-        try:
-            logger.info(f"正在加载模型: {model_name} ")
-            self.model = WhisperModel(
-                model_name, 
-                device="cpu",           
-                compute_type="int8",   
-                cpu_threads=8,             
-                num_workers=1 
-            )
-            self.model_name = model_name
-            logger.info(f"模型 {model_name} 加载成功")
-            return self.model
-        except Exception as e:
-            logger.error(f"模型加载失败: {str(e)}")
-            # 如果加载失败，尝试加载默认模型
-            if model_name != DEFAULT_MODEL:
-                logger.info(f"尝试加载默认模型: {DEFAULT_MODEL}")
-                self.model = WhisperModel(
-                    DEFAULT_MODEL, 
-                    device="cpu", 
-                    compute_type="int8", 
-                    cpu_threads=8, 
-                    num_workers=1
-                )
-                self.model_name = DEFAULT_MODEL
-                return self.model
-            raise
+        logger.info(f"正在加载模型: {model_name} ")
+        model = self.create_model(model_name)
+        self.install_model(model_name, model)
+        return model
+    
+    def install_model(self, model_name, model):
+        """
+        替换当前服务模型，下一次转写即使用新模型
+        
+        Args:
+            model_name: 模型名称
+            model: 已加载的模型实例
+        """
+        self.model = model
+        self.model_name = model_name
+        with self.aux_lock:
+            if self.aux_model_name == model_name:
+                self.aux_model = None
+                self.aux_model_name = None
+        logger.info(f"模型 {model_name} 加载成功")
+    
+    def mel_bins(self, model_name):
+        """
+        获取已加载模型的 mel 维度
+        
+        Args:
+            model_name: 模型名称
+            
+        Returns:
+            int: mel 滤波器数量，模型尚未加载时为 None
+        """
+        if model_name == self.model_name:
+            model = self.model
+        else:
+            with self.aux_lock:
+                model = self.aux_model if self.aux_model_name == model_name else None
+        if model is None:
+            return None
+        return model.feature_extractor.mel_filters.shape[0]
+    
+    def feed_features(self, audio_samples, offset):
+        """
+        预先计算一个窗口的 mel 特征，供之后对同一段音频的解码复用
+        
+        Args:
+            audio_samples: 即将送入模型的音频
+            offset: 音频起点在流中的偏移（采样点）
+        """
+        feature_cache.feed(audio_samples, offset, self.model.feature_extractor.extractor)
     
-    def transcribe(self, audio_samples, language):
+    def transcribe(self, audio_samples, language, model=None, beam_size=1,
+                   clip_timestamps=None, vad_filter=True, stream_offset=None):
         """
         转写音频
         
         Args:
             audio_samples: 音频样本数据
             language: 语言代码
+            model: 可选的模型实例，默认使用当前服务模型
+            beam_size: 束搜索宽度，实时路径保持为1
+            clip_timestamps: 外部 VAD 给出的语音区间（秒），提供时关闭模型内部 VAD
+            vad_filter: 未提供 clip_timestamps 时是否启用模型内部 VAD
+            stream_offset: 音频副本在流中的偏移，用于复用特征缓存
             
         Returns:
             tuple: (segments, info) 转写结果和信息
         """
         # 使用速度优化的推理参数
         config = ANTI_HALLUCINATION_CONFIG
-        return self.model.transcribe(
-            audio_samples, 
-            language=language,
-            beam_size=1,                          # 从默认5降到1，大幅提升速度
-            best_of=1,                           # 从默认5降到1，提升速度
-            temperature=config["temperature"],
-            no_speech_threshold=config["no_speech_threshold"],
-            condition_on_previous_text=config["condition_on_previous_text"],
-            compression_ratio_threshold=config["compression_ratio_threshold"],
-            log_prob_threshold=config["log_prob_threshold"],
-            initial_prompt=config["initial_prompt"],
-            word_timestamps=False,                # 不生成词级时间戳，提升速度
-            vad_filter=True,                     # 启用 VAD 过滤，减少无效推理
-            vad_parameters=dict(
-                min_silence_duration_ms=500,      # 最小静音持续时间
-                speech_pad_ms=400                 # 语音填充时间
+        model = model or self.model
+        if clip_timestamps:
+            vad_filter = False
+        # 特征在 transcribe 调用内同步计算，返回的分段生成器不再需要特征提取
+        with feature_cache.bind(audio_samples, stream_offset):
+            return model.transcribe(
+                audio_samples, 
+                language=language,
+                beam_size=beam_size,                  # 实时路径从默认5降到1，大幅提升速度
+                best_of=beam_size,                   # 与 beam_size 保持一致
+                temperature=config["temperature"],
+                no_speech_threshold=config["no_speech_threshold"],
+                condition_on_previous_text=config["condition_on_previous_text"],
+                compression_ratio_threshold=config["compression_ratio_threshold"],
+                log_prob_threshold=config["log_prob_threshold"],
+                initial_prompt=config["initial_prompt"],
+                word_timestamps=False,                # 不生成词级时间戳，提升速度
+                vad_filter=vad_filter,               # 启用 VAD 过滤，减少无效推理
+                vad_parameters=dict(
+                    min_silence_duration_ms=VAD_CONFIG["min_silence_duration_ms"],
+                    speech_pad_ms=VAD_CONFIG["speech_pad_ms"]
+                ),
+                clip_timestamps=clip_timestamps or "0"  # 只解码语音区间
             )
-        )
+
+    def detect_language(self, audio_samples):
+        """
+        检测音频的语言
+        
+        Args:
+            audio_samples: 音频样本数据
+            
+        Returns:
+            tuple: (language, probability) 语言代码和概率
+        """
+        language, probability, _ = self.model.detect_language(audio_samples)
+        return language, probability
 
 # 创建全局 Whisper 服务实例
 whisper_service = WhisperService()
\ No newline at end of file
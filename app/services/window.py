@@ -0,0 +1,82 @@
+"""
+转写窗口长度自动调节服务
+"""
+from app.core.logging import logger
+from app.config import BUFFER_SECONDS, WINDOW_CONTROL_CONFIG
+
+class WindowController:
+    """
+    窗口长度控制器
+
+    每次推理后记录推理耗时与窗口音频时长之比（实时率），做指数平均。
+    一个窗口的端到端延迟约为 窗口长度 × (1 + 实时率)，据此反推出满足目标延迟的窗口长度，
+    但不超过默认窗口长度 BUFFER_SECONDS：推理很快时保持默认窗口，不为凑满目标延迟而加长；
+    实时率超过上限时说明推理跟不上，才逐步加长窗口以摊薄每次调用的固定开销。
+    每次调整幅度受限，结果限制在配置的上下限内。
+    """
+
+    def __init__(self):
+        """初始化控制器"""
+        self.config = WINDOW_CONTROL_CONFIG
+        self.reset()
+
+    def reset(self):
+        """恢复初始窗口长度，在新会话开始时调用"""
+        self.window_seconds = float(BUFFER_SECONDS)
+        self.rtf = None
+        self.last_inference = None
+        self.last_audio = None
+        self.adjustments = 0
+
+    def record(self, inference_seconds, audio_seconds):
+        """
+        记录一次推理并调整窗口长度
+
+        Args:
+            inference_seconds: 推理耗时
+            audio_seconds: 送入推理的音频时长
+        """
+        if audio_seconds <= 0:
+            return
+
+        self.last_inference = inference_seconds
+        self.last_audio = audio_seconds
+        rtf = inference_seconds / audio_seconds
+        alpha = self.config["smoothing"]
+        self.rtf = rtf if self.rtf is None else alpha * rtf + (1 - alpha) * self.rtf
+
+        if not self.config["enabled"]:
+            return
+
+        if self.rtf > self.config["max_rtf"]:
+            target = self.config["max_seconds"]
+        else:
+            target = min(self.config["target_latency"] / (1 + self.rtf), float(BUFFER_SECONDS))
+
+        step = self.config["max_step"]
+        proposed = self.window_seconds + max(-step, min(step, target - self.window_seconds))
+        proposed = max(self.config["min_seconds"], min(self.config["max_seconds"], proposed))
+
+        if abs(proposed - self.window_seconds) >= 0.05:
+            logger.debug(f"调整窗口长度: {self.window_seconds:.2f}s -> {proposed:.2f}s (rtf: {self.rtf:.3f})")
+            self.window_seconds = proposed
+            self.adjustments += 1
+
+    def get_status(self):
+        """
+        获取控制器状态
+
+        Returns:
+            dict: 状态信息
+        """
+        return {
+            "enabled": self.config["enabled"],
+            "window_seconds": self.window_seconds,
+            "rtf": self.rtf,
+            "estimated_latency": self.window_seconds * (1 + self.rtf) if self.rtf is not None else None,
+            "last_inference_seconds": self.last_inference,
+            "last_audio_seconds": self.last_audio,
+            "adjustments": self.adjustments,
+            "bounds": [self.config["min_seconds"], self.config["max_seconds"]],
+            "target_latency": self.config["target_latency"]
+        }